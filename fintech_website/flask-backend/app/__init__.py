@@ -1,12 +1,19 @@
 from flask import Flask, jsonify, request
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended import JWTManager, jwt_required
+from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
-from datetime import timedelta
 from app.models import db
+from app.config import config_by_name
+from app.storage import engine_options, init_storage, normalize_database_url
+from app.utils.conditional import init_conditional_requests
+from app.utils.query_stats import init_query_stats
+from app.utils.serialization import OrjsonProvider
 
-def create_app():
+def create_app(config_name=None):
     app = Flask(__name__, instance_relative_config=True)
+    app.json = OrjsonProvider(app)
     
     # Setup CORS with more specific configuration
     CORS(app, 
@@ -23,20 +30,54 @@ def create_app():
     except OSError as e:
         print(f"Error creating instance path: {e}")
     
-    # Configure SQLite to use the standard Flask instance folder
-    db_path = os.path.join(app.instance_path, 'fintech.db')
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Load environment-specific settings (APP_ENV: development, testing or production)
+    config_name = config_name or os.environ.get('APP_ENV', 'development')
+    app.config.from_object(config_by_name[config_name])
     
-    # JWT Configuration
-    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY', 'your-secret-key-for-development')
-    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
-    app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
+    # Use the configured database, or SQLite in the standard Flask instance folder
+    database_url = app.config.get('DATABASE_URL')
+    if not database_url:
+        db_path = os.path.join(app.instance_path, 'fintech.db')
+        database_url = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_DATABASE_URI'] = normalize_database_url(database_url)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+    
+    # Take the client address from the trusted proxies' X-Forwarded-For
+    if app.config['TRUSTED_PROXY_COUNT']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['TRUSTED_PROXY_COUNT'])
     
     # Initialize extensions
     db.init_app(app)
+    init_storage(app, db)
+    Migrate(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'))
     jwt = JWTManager(app)
     
+    # Every token is issued by app/services/tokens.py with the configured key
+    from app.services.tokens import init_tokens
+    init_tokens(app, jwt)
+    
+    # Reject revoked tokens on every protected request
+    from app.services.revocation import init_token_revocation
+    init_token_revocation(app, jwt)
+    init_query_stats(app)
+    init_conditional_requests(app)
+    
+    # Password hashing on a bounded worker pool
+    from app.services.passwords import init_password_hasher
+    init_password_hasher(app)
+    
+    # Read-through cache of vehicle and station rows
+    from app.services.entity_cache import cache_stats, init_entity_cache
+    init_entity_cache(app)
+    
+    # Role and managed stations of the admin behind each request
+    from app.services.authz import init_authz, is_admin_authorized, managed_stations
+    init_authz(app)
+    
+    # Rate limits on login, registration, KYC and payment orders
+    from app.services.rate_limits import init_rate_limits
+    init_rate_limits(app)
+    
     # Add diagnostic routes
     @app.route("/debug", methods=["GET", "POST", "OPTIONS"])
     def debug():
@@ -84,6 +125,7 @@ def create_app():
     from app.routes.station import station_bp
     from app.routes.vehicle import vehicle_bp
     from app.routes.rental import rental_bp
+    from app.routes.promotion import promotion_bp
 
     from app.routes.kyc import kyc_bp
 
@@ -95,17 +137,34 @@ def create_app():
     app.register_blueprint(station_bp, url_prefix="/api/station")
     app.register_blueprint(vehicle_bp, url_prefix="/api/vehicle")
     app.register_blueprint(rental_bp, url_prefix="/api/rentals")
+    app.register_blueprint(promotion_bp, url_prefix="/api/promotions")
     app.register_blueprint(kyc_bp, url_prefix="/api/kyc")
-    
+
+    # Nightly jobs, e.g. `flask settlement reconcile`
+    from app.cli import settlement_cli
+    app.cli.add_command(settlement_cli)
+
     # Import all models before creating tables
     from app.models.user import User
     from app.models.station import Station # Import Station first
     from app.models.admin import Admin # Then import Admin
     from app.models.vehicle import Vehicle
     from app.models.rental import Rental
+    from app.models.promotion import Promotion, PromotionUsage
+    from app.models.revoked_token import RevokedToken
     
-    with app.app_context():
-        db.create_all()
+    # Tables come from migrations; see migrations/ and `flask db upgrade`
+    if app.config['AUTO_CREATE_SCHEMA']:
+        with app.app_context():
+            db.create_all()
+
+    @app.route("/api/cache/stats", methods=["GET"])
+    @jwt_required()
+    def entity_cache_stats():
+        """Hit and miss counts of this worker's entity and managed-station caches (admins only)"""
+        if not is_admin_authorized():
+            return jsonify({"error": "Unauthorized"}), 403
+        return jsonify({"success": True, "caches": cache_stats(), "managed_stations": managed_stations.stats()}), 200
 
     @app.route("/")
     def home():
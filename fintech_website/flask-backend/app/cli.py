@@ -0,0 +1,101 @@
+import click
+from datetime import datetime, timedelta
+from flask.cli import AppGroup
+from sqlalchemy.orm import undefer, undefer_group
+from app.models import db
+from app.models.rental import Rental
+from app.models.vehicle import Vehicle
+from app.services import settlement
+
+settlement_cli = AppGroup('settlement', help='End-of-rental settlement.')
+
+# Rentals loaded and settled per batch during reconciliation
+RECONCILE_BATCH_SIZE = 1000
+
+# Amounts closer than this are considered equal
+AMOUNT_TOLERANCE = 1e-6
+
+
+# Completed rentals returned in [start, end), in batches of (rental, hourly_rate)
+# ordered by id, so memory stays flat however many rentals there are
+def completed_rental_batches(start, end, batch_size=RECONCILE_BATCH_SIZE):
+    last_id = None
+    while True:
+        query = db.session.query(Rental, Vehicle.hourly_rate).join(
+            Vehicle, Rental.vehicle_id == Vehicle.id
+        ).options(
+            undefer_group('inspections'),
+            undefer(Rental.additional_charges)
+        ).filter(
+            Rental.status == "COMPLETED",
+            Rental.actual_end_date >= start,
+            Rental.actual_end_date < end
+        )
+        if last_id is not None:
+            query = query.filter(Rental.id > last_id)
+        rows = query.order_by(Rental.id).limit(batch_size).all()
+        if not rows:
+            return
+        # Read before the caller commits or expunges the batch
+        last_id = rows[-1][0].id
+        yield rows
+
+
+def _same_amount(a, b):
+    return abs((a or 0) - (b or 0)) <= AMOUNT_TOLERANCE
+
+
+# Differences between a rental's stored settlement and a fresh one, as messages
+def settlement_differences(rental, settled):
+    stored = [
+        (charge.get("type"), charge.get("amount"))
+        for charge in rental.additional_charges or []
+        if charge.get("type") in settlement.CHARGE_TYPES
+    ]
+    expected = [(charge["type"], charge["amount"]) for charge in settled.charges]
+
+    differences = []
+    if len(stored) != len(expected) or any(
+        stored_type != expected_type or not _same_amount(stored_amount, expected_amount)
+        for (stored_type, stored_amount), (expected_type, expected_amount) in zip(stored, expected)
+    ):
+        differences.append(f"charges {stored} != {expected}")
+
+    expected_total = settlement.total_cost(rental, settled)
+    if not _same_amount(rental.total_cost, expected_total):
+        differences.append(f"total_cost {rental.total_cost} != {expected_total}")
+    return differences
+
+
+@settlement_cli.command('reconcile')
+@click.option('--date', 'day', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='UTC day of the returns to check (default: yesterday).')
+@click.option('--fix', is_flag=True, help='Rewrite settlements that differ.')
+def reconcile(day, fix):
+    """Re-settle a day's completed rentals and report any that differ."""
+    if day is None:
+        day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+    checked = mismatched = 0
+    for rows in completed_rental_batches(day, day + timedelta(days=1)):
+        inputs = [
+            settlement.SettlementInput.from_rental(rental, settlement.recorded_hourly_rate(rental, hourly_rate))
+            for rental, hourly_rate in rows
+        ]
+        for (rental, _), settled in zip(rows, settlement.settle_many(inputs)):
+            checked += 1
+            differences = settlement_differences(rental, settled)
+            if not differences:
+                continue
+            mismatched += 1
+            click.echo(f"Rental {rental.id}: {'; '.join(differences)}")
+            if fix:
+                rental.additional_charges = settlement.merge_charges(rental.additional_charges, settled)
+                rental.total_cost = settlement.total_cost(rental, settled)
+        if fix:
+            db.session.commit()
+        # Release the batch's ORM objects before loading the next one
+        db.session.expunge_all()
+
+    action = "fixed" if fix else "found"
+    click.echo(f"Checked {checked} completed rentals for {day:%Y-%m-%d}, {action} {mismatched} mismatches.")
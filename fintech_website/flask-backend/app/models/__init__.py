@@ -1,7 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.postgresql import JSONB
 
 db = SQLAlchemy()
 
+# JSON column stored as native JSONB on PostgreSQL and as JSON text elsewhere
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
+
 # # Import and expose your models
 # from .vehicle import Vehicle
 # from .station import Station
@@ -29,7 +29,7 @@ class Admin(db.Model):
     last_login_at = Column(DateTime, nullable=True)
     is_active = Column(Boolean, default=True, nullable=False)
     created_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc), nullable=False)
-    updated_at = Column(DateTime, default=datetime.datetime.now(datetime.timezone.utc), onupdate=datetime.datetime.now(datetime.timezone.utc), nullable=False)
+    updated_at = Column(DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), onupdate=lambda: datetime.datetime.now(datetime.timezone.utc), nullable=False)
     created_by = Column(String(36), ForeignKey("admins.id"), nullable=True)
     profile_image = Column(String(255), nullable=True)
     two_factor_enabled = Column(Boolean, default=False, nullable=False)
@@ -37,6 +37,7 @@ class Admin(db.Model):
     # Relationships
     creator = relationship("Admin", remote_side=[id], backref="created_admins")
     station = relationship("Station", backref="station_masters", foreign_keys=[station_id])
+    managed_stations = relationship("Station", foreign_keys="Station.station_master_id", back_populates="station_master")
     
     def __repr__(self):
         return f"<Admin {self.email} ({self.role})>"
@@ -0,0 +1,48 @@
+from sqlalchemy.dialects.postgresql import UUID
+from app.models import db
+import datetime
+import hashlib
+import uuid
+
+
+# Codes are matched case-insensitively and ignoring surrounding whitespace
+def hash_code(code):
+    return hashlib.sha256(code.strip().upper().encode()).hexdigest()
+
+
+class Promotion(db.Model):
+    __tablename__ = 'promotions'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    code = db.Column(db.String(50), nullable=False)  # As entered, for display
+    # SHA-256 of the normalized code; redemptions look codes up through its unique index
+    code_hash = db.Column(db.String(64), nullable=False, unique=True)
+    description = db.Column(db.String(255))
+
+    discount_type = db.Column(db.String(20), nullable=False)  # PERCENT, FIXED
+    discount_value = db.Column(db.Float, nullable=False)  # Percentage off, or amount off
+    max_discount = db.Column(db.Float)  # Cap on a PERCENT discount
+
+    # Validity window, naive UTC; either end may be open
+    valid_from = db.Column(db.DateTime)
+    valid_until = db.Column(db.DateTime)
+
+    # Usage caps, None for unlimited. redemption_count is only changed with
+    # conditional UPDATEs (see app/services/promotions.py)
+    max_redemptions = db.Column(db.Integer)
+    max_redemptions_per_user = db.Column(db.Integer)
+    redemption_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    is_active = db.Column(db.Boolean, default=True)
+    created_by = db.Column(db.String(36), db.ForeignKey('admins.id'))
+    created_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), onupdate=lambda: datetime.datetime.now(datetime.timezone.utc))
+
+
+class PromotionUsage(db.Model):
+    """Per-user redemption counter of a promotion, one row per (promotion, user)"""
+    __tablename__ = 'promotion_usages'
+
+    promotion_id = db.Column(db.String(36), db.ForeignKey('promotions.id'), primary_key=True)
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), primary_key=True)
+    redemption_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
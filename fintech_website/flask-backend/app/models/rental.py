@@ -1,13 +1,28 @@
-from app.models import db
+from sqlalchemy.dialects.postgresql import UUID
+from app.models import db, JSONType
 # from datetime import datetime
 import datetime
 import uuid
 
 class Rental(db.Model):
     __tablename__ = 'rentals'
+    __table_args__ = (
+        # Covers the booking overlap check in create_rental
+        db.Index('ix_rentals_vehicle_status_period', 'vehicle_id', 'status', 'start_date', 'end_date'),
+        # /active and /upcoming: user + status, ordered by (start_date, id)
+        db.Index('ix_rentals_user_status_start', 'user_id', 'status', 'start_date', 'id'),
+        # /past filters on two statuses, so status can't lead the index without
+        # forcing a sort; order by (end_date, id) (the default sort) per user instead
+        db.Index('ix_rentals_user_end_date', 'user_id', 'end_date', 'id'),
+        # /admin/pending: status ordered by (booking_date, id)
+        db.Index('ix_rentals_status_booking_date', 'status', 'booking_date', 'id'),
+        # Station master scoping of pending rentals
+        db.Index('ix_rentals_pickup_station_id', 'pickup_station_id'),
+        db.Index('ix_rentals_return_station_id', 'return_station_id'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=str(uuid.uuid4()))
-    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'), nullable=False)
     vehicle_id = db.Column(db.String(36), db.ForeignKey('vehicles.id'), nullable=False)
     pickup_station_id = db.Column(db.String(36), db.ForeignKey('stations.id'), nullable=False)
     return_station_id = db.Column(db.String(36), db.ForeignKey('stations.id'), nullable=False)
@@ -28,14 +43,17 @@ class Rental(db.Model):
     initial_odometer = db.Column(db.Float)
     final_odometer = db.Column(db.Float)
     
-    pre_rental_inspection = db.Column(db.JSON)
-    post_rental_inspection = db.Column(db.JSON)
+    # Heavy JSON columns are deferred: loaded on first access or with undefer()
+    pre_rental_inspection = db.deferred(db.Column(JSONType), group='inspections')
+    post_rental_inspection = db.deferred(db.Column(JSONType), group='inspections')
     
     total_cost = db.Column(db.Float)
     rental_cost = db.Column(db.Float)
-    additional_charges = db.Column(db.JSON)  # Array of additional charges
+    additional_charges = db.deferred(db.Column(JSONType))  # Array of additional charges
     discount = db.Column(db.Float, default=0)
     discount_code = db.Column(db.String(50))
+    # Promotion redeemed by this booking, set in the booking transaction; releases go by this id
+    promotion_id = db.Column(db.String(36), db.ForeignKey('promotions.id', name='fk_rentals_promotion_id_promotions'))
     tax_amount = db.Column(db.Float, default=0)
     
     payment_status = db.Column(db.String(20), default='PENDING')  # PENDING, AUTHORIZED, PAID, REFUNDED, DISPUTED, FAILED
@@ -45,10 +63,13 @@ class Rental(db.Model):
     loyalty_points_earned = db.Column(db.Integer, default=0)
     
     created_at = db.Column(db.DateTime, default=datetime.datetime.now(datetime.timezone.utc))
-    updated_at = db.Column(db.DateTime, default=datetime.datetime.now(datetime.timezone.utc), onupdate=datetime.datetime.now(datetime.timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), onupdate=lambda: datetime.datetime.now(datetime.timezone.utc))
     notes = db.Column(db.Text)
-    tracking_data = db.Column(db.JSON)  # Array of tracking data points
+    tracking_data = db.deferred(db.Column(JSONType))  # Array of tracking data points
     
     # Relationships
+    user = db.relationship('User', back_populates='rentals')
+    vehicle = db.relationship('Vehicle', back_populates='rentals')
     pickup_station = db.relationship('Station', foreign_keys=[pickup_station_id])
-    return_station = db.relationship('Station', foreign_keys=[return_station_id])
\ No newline at end of file
+    return_station = db.relationship('Station', foreign_keys=[return_station_id])
+    approver = db.relationship('Admin', foreign_keys=[approved_by])
\ No newline at end of file
@@ -0,0 +1,11 @@
+from app.models import db
+
+
+class RevokedToken(db.Model):
+    """A revoked JWT, kept until the token would have expired anyway"""
+    __tablename__ = 'revoked_tokens'
+
+    # The token's jti claim (or a digest of tokens issued without one)
+    jti = db.Column(db.String(64), primary_key=True)
+    # Naive UTC; rows past this are deleted by eviction
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
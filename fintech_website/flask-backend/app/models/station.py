@@ -1,10 +1,14 @@
-from app.models import db
+from app.models import db, JSONType
 from datetime import datetime
 import uuid
 
 class Station(db.Model):
     __tablename__ = 'stations'
-    # __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        # Station master lookups and scoping of /list
+        db.Index('ix_stations_station_master_id', 'station_master_id'),
+        db.Index('ix_stations_is_active', 'is_active'),
+    )
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = db.Column(db.String(100), nullable=False)
@@ -25,7 +29,7 @@ class Station(db.Model):
     contact_email = db.Column(db.String(120))
     
     # Operating Hours
-    operating_hours = db.Column(db.JSON)  # JSON format for opening and closing times
+    operating_hours = db.Column(JSONType)  # JSON format for opening and closing times
     
     # Capacity and Availability
     capacity = db.Column(db.Integer)  # Total parking spots
@@ -33,12 +37,17 @@ class Station(db.Model):
     charging_stations = db.Column(db.Integer)  # Number of charging points
     
     # Relationships - Note we're removing the bidirectional relationship that was causing problems
-    station_master_id = db.Column(db.String(36), db.ForeignKey('admins.id', deferrable=True))
+    # use_alter breaks the admins <-> stations foreign key cycle when creating tables on PostgreSQL
+    station_master_id = db.Column(db.String(36), db.ForeignKey('admins.id', deferrable=True, use_alter=True, name='fk_stations_station_master_id'))
     
     # Status and Metadata
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Relationships
+    vehicles = db.relationship('Vehicle', back_populates='station')
+    station_master = db.relationship('Admin', foreign_keys=[station_master_id], back_populates='managed_stations')
+    
     def __repr__(self):
         return f"<Station {self.name}>"
\ No newline at end of file
@@ -59,5 +59,8 @@ class User(db.Model):
     referred_by_id = db.Column(UUID(as_uuid=True), db.ForeignKey('users.id'))
     referred_users = db.relationship('User', backref=db.backref('referred_by', remote_side=[id]))
     
+    # Rentals booked by this user
+    rentals = db.relationship('Rental', back_populates='user')
+    
     def __repr__(self):
         return f'<User {self.email}>'
\ No newline at end of file
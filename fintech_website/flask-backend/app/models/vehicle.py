@@ -1,12 +1,18 @@
-from app.models import db
+from app.models import db, JSONType
 # from datetime import datetime
 import datetime
 import uuid
 
 class Vehicle(db.Model):
     __tablename__ = 'vehicles'
+    __table_args__ = (
+        # Station listings, availability search and station master scoping
+        db.Index('ix_vehicles_station_status', 'station_id', 'status'),
+        # Nearby search and list filters on status and type
+        db.Index('ix_vehicles_status_type', 'status', 'vehicle_type'),
+    )
     
-    id = db.Column(db.String(36), primary_key=True, default=str(uuid.uuid4()))
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     model = db.Column(db.String(100), nullable=False)
     # manufacturer = db.Column(db.String(100), nullable=False)
     # year = db.Column(db.Integer)
@@ -18,6 +24,7 @@ class Vehicle(db.Model):
     range = db.Column(db.Float)  # km on full charge
     # current_charge_level = db.Column(db.Float)  # Percentage
     status = db.Column(db.String(20), default='AVAILABLE')  # AVAILABLE, RENTED, MAINTENANCE, CHARGING, OUT_OF_SERVICE
+    booking_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # Bumped by every booking and rental start
     
     # Current location
     latitude = db.Column(db.Float)
@@ -33,10 +40,10 @@ class Vehicle(db.Model):
     # JSON fields
     # features = db.Column(db.JSON)  # Array of features
     # maintenance_history = db.Column(db.JSON)  # Array of maintenance events
-    image_urls = db.Column(db.JSON)  # Array of image URLs
+    image_urls = db.deferred(db.Column(JSONType))  # Array of image URLs, deferred: loaded on access or with undefer()
     
     created_at = db.Column(db.DateTime, default=datetime.datetime.now(datetime.timezone.utc))
-    updated_at = db.Column(db.DateTime, default=datetime.datetime.now(datetime.timezone.utc), onupdate=datetime.datetime.now(datetime.timezone.utc))
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.datetime.now(datetime.timezone.utc), onupdate=lambda: datetime.datetime.now(datetime.timezone.utc))
     # last_maintenance_date = db.Column(db.Date)
     # next_maintenance_date = db.Column(db.Date)
     total_rentals = db.Column(db.Integer, default=0)
@@ -44,5 +51,6 @@ class Vehicle(db.Model):
     min_loyalty_tier = db.Column(db.String(20), default='BASIC')  # BASIC, SILVER, GOLD, PLATINUM
     
     # Relationships
-    # rentals = db.relationship('Rental', backref='vehicle', lazy=True)
+    station = db.relationship('Station', back_populates='vehicles')
+    rentals = db.relationship('Rental', back_populates='vehicle')
 
@@ -1,30 +1,24 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 # from datetime import datetime, date
 from ..models.user import db, User
 from ..models.admin import Admin, RoleEnum
+from ..services.passwords import PasswordHasherBusy, password_hasher
+from ..services import revocation, tokens
+from ..services.rate_limits import account_key, limit
 import uuid
 import re
-import jwt
-import os
 from flask_cors import CORS
 # from datetime import timedelta
 import datetime
 #  datetime
 
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, jwt_required, get_jwt
+from flask_jwt_extended import decode_token, jwt_required, get_jwt_identity, get_jwt
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 CORS(auth_bp, resources={r"/*": {"origins": "*"}}, supports_credentials=True)
 
-# Store blacklisted tokens (Use Redis or database for production)
-blacklisted_tokens = set()
-
-# SECRET KEY (Ensure this is set as an environment variable in production)
-JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'dev-secret-key')
-JWT_BLACKLIST_ENABLED = True
-JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
-
 @auth_bp.route('/test-simple', methods=['GET', 'POST'])
 def test_simple():
     return jsonify({'message': 'This is a simple test route'})
@@ -54,6 +48,7 @@ def simple_register():
 
 
 @auth_bp.route('/register', methods=['POST', 'OPTIONS'])
+@limit('REGISTER_RATE_LIMIT', methods=['POST'])
 def register():
     # Handle OPTIONS request for CORS preflight
     if request.method == 'OPTIONS':
@@ -109,7 +104,7 @@ def register():
             phone=data['phone'],
             first_name=data['first_name'],
             last_name=data['last_name'],
-            password_hash=generate_password_hash(data['password']),
+            password_hash=password_hasher.hash(data['password']),
             date_of_birth=dob,
             # Optional fields
             street=data.get('street'),
@@ -129,17 +124,7 @@ def register():
             db.session.commit()
             
             # Generate JWT token
-            token_payload = {
-                'user_id': str(new_user.id),
-                'email': new_user.email,
-                'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)  # Token expires in 1 day
-            }
-            
-            token = jwt.encode(
-                token_payload,
-                os.environ.get('JWT_SECRET_KEY', 'dev-secret-key'),
-                algorithm='HS256'
-            )
+            token = tokens.access_token_for(new_user.id, tokens.user_claims(new_user))
             
             # Prepare response
             response_data = {
@@ -164,24 +149,19 @@ def register():
             print(f"Database error: {str(e)}")
             return jsonify({'success': False, 'message': f'Registration failed: {str(e)}'}), 500
             
+    except PasswordHasherBusy:
+        raise
     except Exception as e:
         print(f"Error in register function: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({'success': False, 'message': f'Error processing request: {str(e)}'}), 500 
 
-# Helper function to generate JWT tokens
-def generate_token(user, expires_in=1):
-    payload = {
-        'user_id': str(user.id),
-        'email': user.email,
-        'exp': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=expires_in)  # Token expiry
-    }
-    return jwt.encode(payload, JWT_SECRET_KEY, algorithm='HS256')
-
 
 # -------------------- LOGIN ROUTE --------------------
 @auth_bp.route('/login', methods=['POST'])
+@limit('LOGIN_RATE_LIMIT')
+@limit('LOGIN_ACCOUNT_RATE_LIMIT', key_func=account_key)
 def login():
     data = request.get_json()
     
@@ -191,12 +171,20 @@ def login():
     
     # Find user
     user = User.query.filter_by(email=data['email']).first()
-    if not user or not check_password_hash(user.password_hash, data['password']):
+    if not user:
+        return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
+    
+    valid, new_hash = password_hasher.verify_and_update(user.password_hash, data['password'])
+    if not valid:
         return jsonify({'success': False, 'message': 'Invalid credentials'}), 401
     
-    # Generate tokens
-    access_token = generate_token(user, expires_in=1)  # 1-day expiry
-    refresh_token = generate_token(user, expires_in=7)  # 7-day expiry
+    # Upgrade a hash made with an older method or cost
+    if new_hash:
+        user.password_hash = new_hash
+        db.session.commit()
+    
+    # Generate tokens (1-day access, 7-day refresh)
+    access_token, refresh_token = tokens.issue_tokens(user.id, tokens.user_claims(user))
 
     return jsonify({
         'success': True,
@@ -207,52 +195,56 @@ def login():
 
 # -------------------- LOGOUT ROUTE --------------------
 @auth_bp.route('/logout', methods=['POST'])
+@jwt_required()
 def logout():
-    auth_header = request.headers.get('Authorization')
-    if not auth_header:
-        return jsonify({'success': False, 'message': 'No token provided'}), 400
+    # Revoke the token until it expires; the blocklist loader rejects it from now on
+    claims = get_jwt()
+    revocation.revoke(claims['jti'], claims['exp'])
+
+    # Also end the session's refresh token when the client sends it
+    data = request.get_json(silent=True) or {}
+    if data.get('refresh_token'):
+        try:
+            refresh_claims = decode_token(data['refresh_token'], allow_expired=True)
+        except (PyJWTError, JWTExtendedException):
+            return jsonify({'success': False, 'message': 'Invalid refresh token'}), 400
+        if refresh_claims.get('type') == 'refresh' and refresh_claims.get('sub') == claims['sub']:
+            revocation.revoke(refresh_claims['jti'], refresh_claims['exp'])
 
-    token = auth_header.split(" ")[1]  # Extract token from "Bearer <token>"
-    blacklisted_tokens.add(token)  # Add to blacklist (for production, use Redis or DB)
+    db.session.commit()
 
     return jsonify({'success': True, 'message': 'Logged out successfully'}), 200
 
 # -------------------- REFRESH TOKEN ROUTE --------------------
 @auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
 def refresh_token():
-    auth_header = request.headers.get('Authorization')
-    if not auth_header:
-        return jsonify({'success': False, 'message': 'No refresh token provided'}), 400
+    identity = get_jwt_identity()
 
-    token = auth_header.split(" ")[1]  # Extract token from "Bearer <token>"
-
-    try:
-        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
-        
-        # Check if token is blacklisted
-        if token in blacklisted_tokens:
-            return jsonify({'success': False, 'message': 'Token is blacklisted'}), 401
-        
-        # Generate new access token
-        user = User.query.get(payload['user_id'])
-        if not user:
-            return jsonify({'success': False, 'message': 'User not found'}), 404
+    # Re-read the account so the new token carries its current role and station
+    if get_jwt().get('principal') == 'admin':
+        account = Admin.query.filter_by(id=identity).first()
+        claims = tokens.admin_claims(account) if account else None
+    else:
+        try:
+            account = db.session.get(User, uuid.UUID(identity))
+        except ValueError:
+            account = None
+        claims = tokens.user_claims(account) if account else None
 
-        new_access_token = generate_token(user, expires_in=1)  # 1-day expiry
-        return jsonify({
-            'success': True,
-            'message': 'Token refreshed successfully',
-            'access_token': new_access_token
-        }), 200
+    if not account:
+        return jsonify({'success': False, 'message': 'User not found'}), 404
 
-    except jwt.ExpiredSignatureError:
-        return jsonify({'success': False, 'message': 'Refresh token expired'}), 401
-    except jwt.InvalidTokenError:
-        return jsonify({'success': False, 'message': 'Invalid refresh token'}), 401
+    return jsonify({
+        'success': True,
+        'message': 'Token refreshed successfully',
+        'access_token': tokens.access_token_for(identity, claims)
+    }), 200
 
 
 # Admin Registration
 @auth_bp.route("/admin/register", methods=["POST"])
+@limit("REGISTER_RATE_LIMIT")
 def register_admin():
     data = request.get_json()
     
@@ -274,7 +266,7 @@ def register_admin():
         return jsonify({"error": "Invalid role"}), 400
     
     # Hash the password
-    hashed_password = generate_password_hash(password)
+    hashed_password = password_hasher.hash(password)
     
     # Create new admin - with string UUID instead of UUID object
     new_admin = Admin(
@@ -301,6 +293,8 @@ def register_admin():
 
 # Admin Login
 @auth_bp.route("/admin/login", methods=["POST"])
+@limit("LOGIN_RATE_LIMIT")
+@limit("LOGIN_ACCOUNT_RATE_LIMIT", key_func=account_key)
 def login_admin():
     data = request.get_json()
     email = data.get("email")
@@ -309,24 +303,23 @@ def login_admin():
     # Find admin by email
     admin = Admin.query.filter_by(email=email).first()
     
-    if not admin or not check_password_hash(admin.password_hash, password):
+    if not admin:
+        return jsonify({"error": "Invalid email or password"}), 401
+    
+    valid, new_hash = password_hasher.verify_and_update(admin.password_hash, password)
+    if not valid:
         return jsonify({"error": "Invalid email or password"}), 401
     
+    # Upgrade a hash made with an older method or cost
+    if new_hash:
+        admin.password_hash = new_hash
+    
     # Update last login timestamp
     admin.last_login_at = datetime.datetime.utcnow()
     db.session.commit()
     
-    # Generate JWT tokens - admin.id is already a string in SQLite
-    access_token = create_access_token(
-        identity=admin.id, 
-        additional_claims={
-            "role": admin.role.value,
-            "email": admin.email,
-            "name": f"{admin.first_name} {admin.last_name}"
-        }
-    )
-    
-    refresh_token = create_refresh_token(identity=admin.id)
+    # Generate JWT tokens carrying the role and station routes authorize with
+    access_token, refresh_token = tokens.issue_tokens(admin.id, tokens.admin_claims(admin))
     
     return jsonify({
         "message": "Login successful",
@@ -344,12 +337,10 @@ def login_admin():
 @auth_bp.route("/admin/logout", methods=["POST"])
 @jwt_required()
 def logout_admin():
-    # Get the JWT token from the request
-    jwt_token = get_jwt()["jti"]
-    
-    # Add to blacklist (for production, use Redis or DB)
-    # In a real implementation, you would store this in a persistent storage
-    blacklisted_tokens.add(jwt_token)
+    # Revoke the token until it expires; the blocklist loader rejects it from now on
+    claims = get_jwt()
+    revocation.revoke(claims["jti"], claims["exp"])
+    db.session.commit()
     
     return jsonify({"success": True, "message": "Admin logged out successfully"}), 200
 # Add to your main app.py file:
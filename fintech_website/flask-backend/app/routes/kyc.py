@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 import requests
 import os
 from dotenv import load_dotenv
+from app.services.rate_limits import identity_key, limit
 
 load_dotenv()
 
@@ -26,6 +27,7 @@ def get_access_token():
     return None
 
 @kyc_bp.route('/initiate', methods=['POST'])
+@limit('KYC_RATE_LIMIT', key_func=identity_key)
 def initiate_kyc():
     data = request.json
     aadhaar_number = data.get('aadhaar_number')
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 import razorpay
 import os
 from flask_cors import CORS
+from app.services.rate_limits import identity_key, limit
 
 # Fix the syntax error
 pay_bp = Blueprint("pay", __name__)
@@ -19,6 +20,7 @@ except Exception as e:
     print(f"Failed to initialize Razorpay client: {str(e)}")
 
 @pay_bp.route("/create_order", methods=["POST"])
+@limit("PAYMENT_ORDER_RATE_LIMIT", key_func=identity_key)
 def create_order():
     try:
         data = request.json
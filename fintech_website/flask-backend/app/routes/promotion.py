@@ -0,0 +1,224 @@
+from flask import Blueprint, request, jsonify
+from app.models import db
+from app.models.promotion import Promotion, PromotionUsage, hash_code
+from app.models.admin import RoleEnum
+from app import serializers
+from app.services.authz import is_admin_authorized
+from app.services.promotions import DISCOUNT_TYPES, PromotionError, find_promotion
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import uuid
+from datetime import datetime, timezone
+
+# Create blueprint
+promotion_bp = Blueprint('promotion', __name__, url_prefix='/api/promotions')
+
+# Roles that may create and edit promotions
+PROMOTION_MANAGERS = [RoleEnum.SUPER_ADMIN, RoleEnum.FINANCE_ADMIN]
+
+# Parse a JWT identity into the UUID type used by User.id
+def parse_user_id(user_id):
+    try:
+        return uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+
+# Helper function to parse an optional ISO 8601 date into naive UTC
+def parse_optional_datetime(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+# Helper function to validate promotion fields from a request body and set them
+# on the promotion. Returns an error message, or None when everything is valid
+def apply_promotion_fields(promotion, data):
+    if "code" in data:
+        code = (data["code"] or "").strip()
+        if not code or len(code) > 50:
+            return "code must be 1 to 50 characters"
+        code_hash = hash_code(code)
+        existing = db.session.query(Promotion.id).filter(Promotion.code_hash == code_hash).scalar()
+        if existing and existing != promotion.id:
+            return "A promotion with this code already exists"
+        promotion.code = code
+        promotion.code_hash = code_hash
+
+    if "discount_type" in data:
+        if data["discount_type"] not in DISCOUNT_TYPES:
+            return f"Invalid discount_type. Must be one of: {', '.join(DISCOUNT_TYPES)}"
+        promotion.discount_type = data["discount_type"]
+
+    for field in ("discount_value", "max_discount"):
+        if field in data:
+            value = data[field]
+            if value is not None and (not isinstance(value, (int, float)) or value < 0):
+                return f"{field} must be a non-negative number"
+            setattr(promotion, field, value)
+
+    if promotion.discount_value is None:
+        return "discount_value is required"
+    if promotion.discount_type == "PERCENT" and promotion.discount_value > 100:
+        return "A PERCENT discount_value cannot exceed 100"
+
+    for field in ("max_redemptions", "max_redemptions_per_user"):
+        if field in data:
+            value = data[field]
+            if value is not None and (not isinstance(value, int) or value < 1):
+                return f"{field} must be a positive integer"
+            setattr(promotion, field, value)
+
+    try:
+        for field in ("valid_from", "valid_until"):
+            if field in data:
+                setattr(promotion, field, parse_optional_datetime(data[field]))
+    except ValueError:
+        return "Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SSZ)"
+    if promotion.valid_from and promotion.valid_until and promotion.valid_until <= promotion.valid_from:
+        return "valid_until must be after valid_from"
+
+    if "description" in data:
+        promotion.description = data["description"]
+
+    if "is_active" in data:
+        promotion.is_active = bool(data["is_active"])
+
+    return None
+
+@promotion_bp.route("", methods=["POST"])
+@jwt_required()
+def create_promotion():
+    """Create a discount code"""
+    if not is_admin_authorized(PROMOTION_MANAGERS):
+        return jsonify({"error": "Unauthorized. Insufficient permissions."}), 403
+
+    data = request.get_json()
+
+    # Validate required fields
+    for field in ["code", "discount_type", "discount_value"]:
+        if field not in data:
+            return jsonify({"error": f"Field '{field}' is required"}), 400
+
+    promotion = Promotion(
+        id=str(uuid.uuid4()),
+        redemption_count=0,
+        is_active=True,
+        created_by=get_jwt_identity()
+    )
+    error = apply_promotion_fields(promotion, data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    db.session.add(promotion)
+    db.session.commit()
+
+    return jsonify({
+        "success": True,
+        "message": "Promotion created successfully",
+        "promotion": serializers.promotion_detail(promotion)
+    }), 201
+
+@promotion_bp.route("", methods=["GET"])
+@jwt_required()
+def list_promotions():
+    """List promotions, newest first (admin only)"""
+    if not is_admin_authorized():
+        return jsonify({"error": "Unauthorized. Admin access required."}), 403
+
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 10, type=int)
+
+    query = Promotion.query
+    is_active = request.args.get('is_active')
+    if is_active is not None:
+        query = query.filter(Promotion.is_active == (is_active.lower() == 'true'))
+
+    promotions_page = query.order_by(Promotion.created_at.desc(), Promotion.id).paginate(page=page, per_page=per_page)
+
+    return jsonify({
+        "success": True,
+        "promotions": serializers.promotion_detail.many(promotions_page.items),
+        "pagination": {
+            "total": promotions_page.total,
+            "pages": promotions_page.pages,
+            "current_page": page,
+            "per_page": per_page,
+            "has_next": promotions_page.has_next,
+            "has_prev": promotions_page.has_prev
+        }
+    }), 200
+
+@promotion_bp.route("/validate", methods=["GET"])
+@jwt_required()
+def validate_code():
+    """Check a discount code for the current user before booking"""
+    code = request.args.get('code')
+    if not code:
+        return jsonify({"error": "code is required"}), 400
+
+    try:
+        promotion = find_promotion(code)
+    except PromotionError as e:
+        return jsonify({"valid": False, "error": str(e)}), 200
+
+    # Advisory only: the caps are enforced atomically when the booking is made
+    if promotion.max_redemptions is not None and promotion.redemption_count >= promotion.max_redemptions:
+        return jsonify({"valid": False, "error": "Discount code has reached its usage limit"}), 200
+
+    if promotion.max_redemptions_per_user is not None:
+        user_uuid = parse_user_id(get_jwt_identity())
+        used = db.session.query(PromotionUsage.redemption_count).filter(
+            PromotionUsage.promotion_id == promotion.id,
+            PromotionUsage.user_id == user_uuid
+        ).scalar() if user_uuid else None
+        if (used or 0) >= promotion.max_redemptions_per_user:
+            return jsonify({"valid": False, "error": "You have already used this discount code"}), 200
+
+    return jsonify({
+        "valid": True,
+        "promotion": serializers.promotion_terms(promotion)
+    }), 200
+
+@promotion_bp.route("/<promotion_id>", methods=["GET"])
+@jwt_required()
+def get_promotion(promotion_id):
+    """Get a promotion with its redemption count (admin only)"""
+    if not is_admin_authorized():
+        return jsonify({"error": "Unauthorized. Admin access required."}), 403
+
+    promotion = Promotion.query.get(promotion_id)
+    if not promotion:
+        return jsonify({"error": "Promotion not found"}), 404
+
+    return jsonify({
+        "success": True,
+        "promotion": serializers.promotion_detail(promotion)
+    }), 200
+
+@promotion_bp.route("/<promotion_id>", methods=["PUT"])
+@jwt_required()
+def update_promotion(promotion_id):
+    """Update a promotion's terms, caps, validity window or active flag"""
+    if not is_admin_authorized(PROMOTION_MANAGERS):
+        return jsonify({"error": "Unauthorized. Insufficient permissions."}), 403
+
+    promotion = Promotion.query.get(promotion_id)
+    if not promotion:
+        return jsonify({"error": "Promotion not found"}), 404
+
+    # The counter is only moved by redemptions
+    data = {key: value for key, value in request.get_json().items() if key != "redemption_count"}
+    error = apply_promotion_fields(promotion, data)
+    if error:
+        db.session.rollback()
+        return jsonify({"error": error}), 400
+
+    promotion.updated_at = datetime.now(timezone.utc)
+    db.session.commit()
+
+    return jsonify({
+        "success": True,
+        "message": "Promotion updated successfully",
+        "promotion": serializers.promotion_detail(promotion)
+    }), 200
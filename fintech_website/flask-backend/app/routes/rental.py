@@ -1,12 +1,23 @@
 from flask import Blueprint, request, jsonify
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, or_
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import aliased, joinedload, undefer
 from app.models import db
 from app.models.rental import Rental
 from app.models.vehicle import Vehicle
 from app.models.station import Station
 from app.models.user import User
-from app.models.admin import Admin, RoleEnum
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app import serializers
+from app.routes.vehicle import index_vehicle
+from app.services.authz import current_auth, is_admin_authorized
+from app.services.availability import AvailabilityIndex, BLOCKING_STATUSES, to_naive_utc
+from app.services.entity_cache import station_cache, vehicle_cache
+from app.services import pricing, promotions, settlement
+from app.services.promotions import PromotionError
+from app.utils.conditional import check_not_modified, entity_validators, page_validators
+from app.utils.pagination import InvalidCursor, keyset_paginate_request, wants_cursor
+from app.utils.projection import project, requested_serializer
+from flask_jwt_extended import jwt_required, get_jwt_identity
 import uuid
 from datetime import datetime, timezone, timedelta
 import json
@@ -14,150 +25,192 @@ import json
 # Create blueprint
 rental_bp = Blueprint('rental', __name__, url_prefix='/api/rentals')
 
-# Helper function to check if the current user has admin permissions
-def is_admin_authorized(required_roles=None):
-    jwt_data = get_jwt()
-    role = jwt_data.get("role", None)
-    
-    # If no specific roles required, just check if user has any admin role
-    if not required_roles:
-        return role in [r.value for r in RoleEnum]
-    
-    # Check if user's role is in the required roles list
-    return role in [r.value for r in required_roles]
-
 # Helper function to format rental data for response
 def format_rental_data(rental, include_vehicle_details=False, include_station_details=False):
-    rental_data = {
-        "id": rental.id,
-        "user_id": rental.user_id,
-        "vehicle_id": rental.vehicle_id,
-        "pickup_station_id": rental.pickup_station_id,
-        "return_station_id": rental.return_station_id,
-        "booking_date": rental.booking_date.isoformat() if rental.booking_date else None,
-        "start_date": rental.start_date.isoformat() if rental.start_date else None,
-        "end_date": rental.end_date.isoformat() if rental.end_date else None,
-        "actual_start_date": rental.actual_start_date.isoformat() if rental.actual_start_date else None,
-        "actual_end_date": rental.actual_end_date.isoformat() if rental.actual_end_date else None,
-        "status": rental.status,
-        "approved_by": rental.approved_by,
-        "approval_date": rental.approval_date.isoformat() if rental.approval_date else None,
-        "cancellation_reason": rental.cancellation_reason,
-        "total_cost": rental.total_cost,
-        "rental_cost": rental.rental_cost,
-        "additional_charges": rental.additional_charges,
-        "discount": rental.discount,
-        "discount_code": rental.discount_code,
-        "tax_amount": rental.tax_amount,
-        "payment_status": rental.payment_status,
-        "payment_id": rental.payment_id,
-        "pre_authorization_id": rental.pre_authorization_id,
-        "loyalty_points_earned": rental.loyalty_points_earned,
-        "created_at": rental.created_at.isoformat() if rental.created_at else None,
-        "updated_at": rental.updated_at.isoformat() if rental.updated_at else None
-    }
+    rental_data = serializers.rental_detail(rental)
     
     # Include vehicle details if requested
-    if include_vehicle_details:
-        vehicle = Vehicle.query.get(rental.vehicle_id)
-        if vehicle:
-            rental_data["vehicle"] = {
-                "id": vehicle.id,
-                "model": vehicle.model,
-                "vehicle_type": vehicle.vehicle_type,
-                "image_urls": vehicle.image_urls
-            }
+    if include_vehicle_details and rental.vehicle:
+        rental_data["vehicle"] = serializers.vehicle_brief(rental.vehicle)
     
     # Include station details if requested
     if include_station_details:
-        pickup_station = Station.query.get(rental.pickup_station_id)
-        return_station = Station.query.get(rental.return_station_id)
-        
-        if pickup_station:
-            rental_data["pickup_station"] = {
-                "id": pickup_station.id,
-                "name": pickup_station.name,
-                "address": {
-                    "street": pickup_station.street,
-                    "city": pickup_station.city,
-                    "state": pickup_station.state,
-                    "zip_code": pickup_station.zip_code,
-                    "country": pickup_station.country
-                },
-                "location": {
-                    "latitude": pickup_station.latitude,
-                    "longitude": pickup_station.longitude
-                }
-            }
-        
-        if return_station:
-            rental_data["return_station"] = {
-                "id": return_station.id,
-                "name": return_station.name,
-                "address": {
-                    "street": return_station.street,
-                    "city": return_station.city,
-                    "state": return_station.state,
-                    "zip_code": return_station.zip_code,
-                    "country": return_station.country
-                },
-                "location": {
-                    "latitude": return_station.latitude,
-                    "longitude": return_station.longitude
-                }
-            }
+        if rental.pickup_station:
+            rental_data["pickup_station"] = serializers.station_brief(rental.pickup_station)
+        if rental.return_station:
+            rental_data["return_station"] = serializers.station_brief(rental.return_station)
     
     return rental_data
 
-# Helper function to format rental list items (simplified version for lists)
-def format_rental_list_item(rental):
-    vehicle = Vehicle.query.get(rental.vehicle_id)
-    pickup_station = Station.query.get(rental.pickup_station_id)
-    return_station = Station.query.get(rental.return_station_id)
-    
-    return {
-        "id": rental.id,
-        "vehicle": {
-            "id": vehicle.id,
-            "model": vehicle.model,
-            "vehicle_type": vehicle.vehicle_type,
-            "image_urls": vehicle.image_urls[0] if vehicle.image_urls and len(vehicle.image_urls) > 0 else None
-        },
-        "start_date": rental.start_date.isoformat() if rental.start_date else None,
-        "end_date": rental.end_date.isoformat() if rental.end_date else None,
-        "actual_start_date": rental.actual_start_date.isoformat() if rental.actual_start_date else None,
-        "actual_end_date": rental.actual_end_date.isoformat() if rental.actual_end_date else None,
-        "status": rental.status,
-        "pickup_station_name": pickup_station.name if pickup_station else None,
-        "return_station_name": return_station.name if return_station else None,
-        "total_cost": rental.total_cost,
-        "loyalty_points_earned": rental.loyalty_points_earned
-    }
+# List views read plain rows instead of ORM objects: only the columns the list
+# item serializer needs, labelled with the names it reads
+pickup_station = aliased(Station)
+return_station = aliased(Station)
+
+RENTAL_LIST_COLUMNS = {
+    "id": Rental.id,
+    "booking_date": Rental.booking_date,
+    "start_date": Rental.start_date,
+    "end_date": Rental.end_date,
+    "actual_start_date": Rental.actual_start_date,
+    "actual_end_date": Rental.actual_end_date,
+    "status": Rental.status,
+    "total_cost": Rental.total_cost,
+    "loyalty_points_earned": Rental.loyalty_points_earned,
+    "created_at": Rental.created_at,
+    "vehicle_ref": Vehicle.id,
+    "vehicle_model": Vehicle.model,
+    "vehicle_type": Vehicle.vehicle_type,
+    # Only the first image, extracted in SQL instead of loading the whole array
+    "vehicle_image": Vehicle.image_urls[0].as_string(),
+    "pickup_station_name": pickup_station.name,
+    "return_station_name": return_station.name,
+    "user_ref": User.id,
+    "user_first_name": User.first_name,
+    "user_last_name": User.last_name,
+    "user_email": User.email,
+    "user_phone": User.phone,
+    # Versions of the listed and joined rows, for the list's ETag / Last-Modified
+    "updated_at": Rental.updated_at,
+    "vehicle_updated_at": Vehicle.updated_at,
+    "pickup_station_updated_at": pickup_station.updated_at,
+    "return_station_updated_at": return_station.updated_at,
+    "user_updated_at": User.updated_at,
+}
+
+# Tables joined into the list query, each only when one of its columns is selected,
+# with the label of its updated_at column
+RENTAL_LIST_JOINS = (
+    (Vehicle, Vehicle.id == Rental.vehicle_id, {"vehicle_ref", "vehicle_model", "vehicle_type", "vehicle_image"},
+     "vehicle_updated_at"),
+    (pickup_station, pickup_station.id == Rental.pickup_station_id, {"pickup_station_name"},
+     "pickup_station_updated_at"),
+    (return_station, return_station.id == Rental.return_station_id, {"return_station_name"},
+     "return_station_updated_at"),
+    (User, User.id == Rental.user_id, {"user_ref", "user_first_name", "user_last_name", "user_email", "user_phone"},
+     "user_updated_at"),
+)
+
+# Helper function to list the updated_at labels of the rentals and of every
+# joined table the serializer renders from
+def rental_list_updated_fields(serializer):
+    selected = set(serializer.columns)
+    return ["updated_at"] + [updated for _, _, names, updated in RENTAL_LIST_JOINS if selected & names]
+
+# Helper function to turn a rental list query into a projection of the columns
+# the serializer renders, plus the id and sort key needed for pagination and the
+# versions the list's validators are built from.
+# Returns the projected query and the serializer for its rows
+def project_rental_list(query, serializer, sort_key):
+    selected = set(serializer.columns)
+    for target, onclause, names, _ in RENTAL_LIST_JOINS:
+        if selected & names:
+            query = query.outerjoin(target, onclause)
+    extra = ["id", sort_key, *rental_list_updated_fields(serializer)]
+    return project(query, serializer, RENTAL_LIST_COLUMNS, extra=extra)
+
+# Helper function to compute the ETag / Last-Modified of a page of a projected rental list
+def rental_list_validators(rows, serializer, pagination):
+    return page_validators(rows, rental_list_updated_fields(serializer), pagination)
+
+# Detail views join the related rows into one query, along with the deferred
+# JSON columns they render
+DETAIL_LOAD_OPTIONS = (
+    undefer(Rental.additional_charges),
+    joinedload(Rental.vehicle).undefer(Vehicle.image_urls),
+    joinedload(Rental.pickup_station),
+    joinedload(Rental.return_station),
+)
+
+# Parse a JWT identity into the UUID type used by User.id and Rental.user_id
+def parse_user_id(user_id):
+    try:
+        return uuid.UUID(str(user_id))
+    except ValueError:
+        return None
+
+# Check whether the rental was booked by the given user
+def is_rental_owner(rental, user_id):
+    return rental.user_id is not None and str(rental.user_id) == str(user_id)
+
+# Load the blocking bookings of the given vehicles that have not ended yet
+def load_booked_intervals(vehicle_ids):
+    return db.session.query(
+        Rental.vehicle_id, Rental.id, Rental.start_date, Rental.end_date
+    ).filter(
+        Rental.vehicle_id.in_(vehicle_ids),
+        Rental.status.in_(BLOCKING_STATUSES),
+        Rental.end_date > datetime.now(timezone.utc).replace(tzinfo=None)
+    ).all()
+
+availability_index = AvailabilityIndex(load_booked_intervals)
+
+# How often a booking is retried when another request claimed the vehicle first
+BOOKING_ATTEMPTS = 3
+
+# Insert a rental unless it overlaps another blocking booking of the same vehicle.
+# The vehicle's booking_version is bumped with a compare-and-swap UPDATE before the
+# overlap check, so concurrent bookings of one vehicle serialize on that row while
+# bookings of different vehicles never contend. The status is re-read with the version
+# and required again by the swap, so a vehicle that stopped being available, even
+# through a status change that doesn't bump the version, is never booked.
+# A promotion is redeemed in the same transaction and recorded on the rental, so a
+# booking that fails gives its redemption back. Returns "BOOKED", "UNAVAILABLE", "CONFLICT",
+# "PROMOTION_EXHAUSTED" or "BUSY".
+def reserve_vehicle(rental, promotion=None):
+    for _ in range(BOOKING_ATTEMPTS):
+        try:
+            current = db.session.query(
+                Vehicle.booking_version, Vehicle.status
+            ).filter(Vehicle.id == rental.vehicle_id).first()
+            if current is None or current.status != "AVAILABLE":
+                vehicle_cache.invalidate(rental.vehicle_id)
+                return "UNAVAILABLE"
+            version = current.booking_version
+            
+            claimed = Vehicle.query.filter(
+                Vehicle.id == rental.vehicle_id,
+                Vehicle.booking_version == version,
+                Vehicle.status == "AVAILABLE"
+            ).update({Vehicle.booking_version: version + 1}, synchronize_session=False)
+            
+            if not claimed:
+                # Another booking or a status change for this vehicle committed in between; re-read and retry
+                db.session.rollback()
+                continue
+            
+            overlapping = db.session.query(Rental.id).filter(
+                Rental.vehicle_id == rental.vehicle_id,
+                Rental.status.in_(BLOCKING_STATUSES),
+                Rental.start_date < to_naive_utc(rental.end_date),
+                Rental.end_date > to_naive_utc(rental.start_date)
+            ).first()
+            if overlapping:
+                db.session.rollback()
+                return "CONFLICT"
+            
+            if promotion is not None:
+                if not promotions.redeem(promotion, rental.user_id):
+                    db.session.rollback()
+                    return "PROMOTION_EXHAUSTED"
+                rental.promotion_id = promotion.id
+            
+            db.session.add(rental)
+            db.session.commit()
+            return "BOOKED"
+        except OperationalError:
+            # e.g. SQLite busy timeout while another writer held the lock
+            db.session.rollback()
+    return "BUSY"
+
+# Parse an ISO 8601 date from the request, accepting a trailing Z
+def parse_iso_datetime(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
 
 # Calculate rental cost based on vehicle rates and rental duration
 def calculate_rental_cost(vehicle, start_date, end_date):
-    # Calculate the rental duration in hours
-    duration = (end_date - start_date).total_seconds() / 3600
-    
-    # Determine if hourly, daily, or weekly rate applies
-    hourly_rate = vehicle.hourly_rate or 0
-    daily_rate = vehicle.daily_rate or 0
-    weekly_rate = vehicle.weekly_rate or 0
-    
-    # Calculate costs for different durations
-    if duration <= 24:
-        # Hourly rate (minimum 1 hour)
-        hours = max(1, int(duration))
-        return hourly_rate * hours
-    elif duration <= 168:  # 7 days * 24 hours
-        # Daily rate (minimum 1 day)
-        days = max(1, int(duration / 24))
-        return daily_rate * days
-    else:
-        # Weekly rate plus daily rate for extra days
-        weeks = int(duration / 168)
-        remaining_days = int((duration % 168) / 24)
-        return (weekly_rate * weeks) + (daily_rate * remaining_days)
+    hours = pricing.rental_hours(start_date, end_date)
+    return pricing.rental_cost(vehicle.hourly_rate, vehicle.daily_rate, vehicle.weekly_rate, hours)
 
 @rental_bp.route("/", methods=["GET"])
 def test_rental_route():
@@ -178,8 +231,8 @@ def create_rental():
     
     # Parse dates
     try:
-        start_date = datetime.fromisoformat(data["start_date"].replace('Z', '+00:00'))
-        end_date = datetime.fromisoformat(data["end_date"].replace('Z', '+00:00'))
+        start_date = parse_iso_datetime(data["start_date"])
+        end_date = parse_iso_datetime(data["end_date"])
     except ValueError:
         return jsonify({"error": "Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SSZ)"}), 400
     
@@ -191,39 +244,37 @@ def create_rental():
     if end_date <= start_date:
         return jsonify({"error": "End date must be after start date"}), 400
     
-    # Verify vehicle exists and is available
-    vehicle = Vehicle.query.get(data["vehicle_id"])
+    # Verify vehicle exists and is available (cached snapshot; reserve_vehicle re-checks the status).
+    # The snapshot can predate another worker returning the vehicle, so re-read it before refusing
+    vehicle = vehicle_cache.get(data["vehicle_id"])
+    if vehicle and vehicle.status != "AVAILABLE":
+        vehicle_cache.invalidate(vehicle.id)
+        vehicle = vehicle_cache.get(data["vehicle_id"])
     if not vehicle:
         return jsonify({"error": "Vehicle not found"}), 404
     
     if vehicle.status != "AVAILABLE":
         return jsonify({"error": f"Vehicle is not available (current status: {vehicle.status})"}), 400
     
-    # Check if there are any overlapping rentals for this vehicle
-    overlapping_rentals = Rental.query.filter(
-        Rental.vehicle_id == data["vehicle_id"],
-        Rental.status.in_(["PENDING_APPROVAL", "APPROVED", "ACTIVE"]),
-        or_(
-            and_(Rental.start_date <= start_date, Rental.end_date >= start_date),
-            and_(Rental.start_date <= end_date, Rental.end_date >= end_date),
-            and_(Rental.start_date >= start_date, Rental.end_date <= end_date)
-        )
-    ).all()
-    
-    if overlapping_rentals:
-        return jsonify({"error": "Vehicle is already booked for part or all of the requested time period"}), 409
+    # Check the vehicle's booking timeline for an overlapping [start, end) period.
+    # The timeline can predate another worker cancelling or completing a booking, so reload it before refusing
+    if not availability_index.is_free(vehicle.id, start_date, end_date):
+        availability_index.invalidate(vehicle.id)
+        if not availability_index.is_free(vehicle.id, start_date, end_date):
+            return jsonify({"error": "Vehicle is already booked for part or all of the requested time period"}), 409
     
     # Verify stations exist
-    pickup_station = Station.query.get(data["pickup_station_id"])
+    pickup_station = station_cache.get(data["pickup_station_id"])
     if not pickup_station:
         return jsonify({"error": "Pickup station not found"}), 404
     
-    return_station = Station.query.get(data["return_station_id"])
+    return_station = station_cache.get(data["return_station_id"])
     if not return_station:
         return jsonify({"error": "Return station not found"}), 404
     
     # Get user for loyalty tier check
-    user = User.query.get(user_id)
+    user_uuid = parse_user_id(user_id)
+    user = User.query.get(user_uuid) if user_uuid else None
     if not user:
         return jsonify({"error": "User not found"}), 404
     
@@ -240,25 +291,26 @@ def create_rental():
     # Calculate rental cost
     rental_cost = calculate_rental_cost(vehicle, start_date, end_date)
     
-    # Apply discount if code provided
+    # Apply the promotion behind the discount code; its usage caps are checked when booking
     discount = 0
+    promotion = None
     discount_code = data.get("discount_code")
-    # In real implementation, validate discount code and calculate discount
-    # This is a simplified example
     if discount_code:
-        # Apply a simple 10% discount for demonstration
-        discount = rental_cost * 0.1
+        try:
+            promotion = promotions.find_promotion(discount_code, at=now)
+        except PromotionError as e:
+            return jsonify({"error": str(e)}), 400
+        discount = promotions.discount_for(promotion, rental_cost)
     
-    # Calculate tax (example: 10%)
-    tax_amount = (rental_cost - discount) * 0.1
-    
-    # Calculate total cost
-    total_cost = rental_cost - discount + tax_amount
+    # Calculate tax and total cost
+    quote = pricing.build_quote(rental_cost, discount)
+    tax_amount = quote["tax_amount"]
+    total_cost = quote["total_cost"]
     
     # Create new rental
     new_rental = Rental(
         id=str(uuid.uuid4()),
-        user_id=user_id,
+        user_id=user.id,
         vehicle_id=data["vehicle_id"],
         pickup_station_id=data["pickup_station_id"],
         return_station_id=data["return_station_id"],
@@ -278,8 +330,19 @@ def create_rental():
         updated_at=datetime.now(timezone.utc)
     )
     
-    db.session.add(new_rental)
-    db.session.commit()
+    # Atomically re-check for overlaps and insert the booking
+    outcome = reserve_vehicle(new_rental, promotion)
+    if outcome == "CONFLICT":
+        availability_index.invalidate(new_rental.vehicle_id)
+        return jsonify({"error": "Vehicle is already booked for part or all of the requested time period"}), 409
+    if outcome == "UNAVAILABLE":
+        return jsonify({"error": "Vehicle is not available"}), 400
+    if outcome == "PROMOTION_EXHAUSTED":
+        return jsonify({"error": "Discount code has reached its usage limit"}), 409
+    if outcome == "BUSY":
+        return jsonify({"error": "Vehicle is being booked by another request, please retry"}), 503
+    
+    availability_index.add_booking(new_rental.vehicle_id, new_rental.id, start_date, end_date)
     
     return jsonify({
         "success": True,
@@ -287,22 +350,150 @@ def create_rental():
         "rental": format_rental_data(new_rental)
     }), 201
 
+@rental_bp.route("/availability", methods=["GET"])
+@jwt_required()
+def check_availability():
+    """Check whether a vehicle, or which vehicles at a station, are free for a period"""
+    vehicle_id = request.args.get('vehicle_id')
+    station_id = request.args.get('station_id')
+    
+    if not vehicle_id and not station_id:
+        return jsonify({"error": "vehicle_id or station_id is required"}), 400
+    
+    try:
+        start_date = parse_iso_datetime(request.args["start_date"])
+        end_date = parse_iso_datetime(request.args["end_date"])
+    except KeyError:
+        return jsonify({"error": "start_date and end_date are required"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SSZ)"}), 400
+    
+    if end_date <= start_date:
+        return jsonify({"error": "End date must be after start date"}), 400
+    
+    if vehicle_id:
+        return jsonify({
+            "success": True,
+            "vehicle_id": vehicle_id,
+            "available": availability_index.is_free(vehicle_id, start_date, end_date)
+        }), 200
+    
+    # Vehicles parked at the station that are not out of service
+    vehicle_ids = [row.id for row in db.session.query(Vehicle.id).filter(
+        Vehicle.station_id == station_id,
+        Vehicle.status.in_(["AVAILABLE", "RENTED", "CHARGING"])
+    )]
+    
+    return jsonify({
+        "success": True,
+        "station_id": station_id,
+        "available_vehicle_ids": availability_index.free_vehicles(vehicle_ids, start_date, end_date)
+    }), 200
+
+@rental_bp.route("/search", methods=["GET"])
+@jwt_required()
+def search_available_vehicles():
+    """Find every bookable vehicle at a station for a period, with price quotes"""
+    station_id = request.args.get('station_id')
+    if not station_id:
+        return jsonify({"error": "station_id is required"}), 400
+    
+    try:
+        start_date = parse_iso_datetime(request.args["start_date"])
+        end_date = parse_iso_datetime(request.args["end_date"])
+    except KeyError:
+        return jsonify({"error": "start_date and end_date are required"}), 400
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM:SSZ)"}), 400
+    
+    if end_date <= start_date:
+        return jsonify({"error": "End date must be after start date"}), 400
+    
+    window_start = to_naive_utc(start_date)
+    window_end = to_naive_utc(end_date)
+    
+    # Blocking bookings overlapping the requested [start, end) window
+    overlapping = db.session.query(Rental.id).filter(
+        Rental.vehicle_id == Vehicle.id,
+        Rental.status.in_(BLOCKING_STATUSES),
+        Rental.start_date < window_end,
+        Rental.end_date > window_start
+    ).exists()
+    
+    # One anti-join query instead of checking vehicles one by one
+    query = Vehicle.query.filter(
+        Vehicle.station_id == station_id,
+        Vehicle.status == "AVAILABLE",
+        ~overlapping
+    )
+    
+    vehicle_type = request.args.get('vehicle_type')
+    if vehicle_type:
+        query = query.filter(Vehicle.vehicle_type == vehicle_type.upper())
+    
+    min_range = request.args.get('min_range', type=float)
+    if min_range:
+        query = query.filter(Vehicle.range >= min_range)
+    
+    max_hourly_rate = request.args.get('max_hourly_rate', type=float)
+    if max_hourly_rate:
+        query = query.filter(Vehicle.hourly_rate <= max_hourly_rate)
+    
+    vehicles = []
+    matches = query.options(undefer(Vehicle.image_urls)).order_by(Vehicle.hourly_rate.asc(), Vehicle.id.asc()).all()
+    
+    # Price every match for the window in one batch
+    quotes = pricing.RateTable.from_vehicles(matches).quote(pricing.rental_hours(start_date, end_date)).to_dicts()
+    for vehicle, quote in zip(matches, quotes):
+        vehicles.append({
+            "id": vehicle.id,
+            "model": vehicle.model,
+            "vehicle_type": vehicle.vehicle_type,
+            "range": vehicle.range,
+            "battery_capacity": vehicle.battery_capacity,
+            "image_url": vehicle.image_urls[0] if vehicle.image_urls else None,
+            "min_loyalty_tier": vehicle.min_loyalty_tier,
+            "pricing": {
+                "hourly_rate": vehicle.hourly_rate,
+                "daily_rate": vehicle.daily_rate,
+                "weekly_rate": vehicle.weekly_rate,
+                "security_deposit": vehicle.security_deposit_amount
+            },
+            "quote": quote
+        })
+    
+    return jsonify({
+        "success": True,
+        "station_id": station_id,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "count": len(vehicles),
+        "vehicles": vehicles
+    }), 200
+
 @rental_bp.route("/<rental_id>", methods=["GET"])
 @jwt_required()
 def get_rental(rental_id):
     """Get details of a specific rental"""
     user_id = get_jwt_identity()
     
-    # Check if rental exists
-    rental = Rental.query.get(rental_id)
+    # Check if rental exists, loading its vehicle and stations in the same query
+    rental = Rental.query.options(*DETAIL_LOAD_OPTIONS).filter(Rental.id == rental_id).first()
     if not rental:
         return jsonify({"error": "Rental not found"}), 404
     
     # Check if user is authorized to view this rental
     is_admin = is_admin_authorized()
-    if not is_admin and rental.user_id != user_id:
+    if not is_admin and not is_rental_owner(rental, user_id):
         return jsonify({"error": "Unauthorized to view this rental"}), 403
     
+    # Answer 304 without rendering when the client's copy is current
+    not_modified = check_not_modified(entity_validators(
+        rental, rental.vehicle, rental.pickup_station, rental.return_station
+    ))
+    if not_modified:
+        return not_modified
+    
     return jsonify({
         "success": True,
         "rental": format_rental_data(rental, include_vehicle_details=True, include_station_details=True)
@@ -322,7 +513,7 @@ def cancel_rental(rental_id):
     
     # Check if user is authorized to cancel this rental
     is_admin = is_admin_authorized()
-    if not is_admin and rental.user_id != user_id:
+    if not is_admin and not is_rental_owner(rental, user_id):
         return jsonify({"error": "Unauthorized to cancel this rental"}), 403
     
     # Check if rental can be cancelled
@@ -333,6 +524,10 @@ def cancel_rental(rental_id):
     if rental.status == "ACTIVE" and not is_admin:
         return jsonify({"error": "Cannot cancel an active rental. Please contact customer support."}), 400
     
+    # A booking cancelled before it started gives its discount code use back
+    if rental.promotion_id:
+        promotions.release(rental.promotion_id, rental.user_id)
+    
     # Update rental status
     rental.status = "CANCELLED"
     rental.cancellation_reason = data.get("cancellation_reason")
@@ -360,6 +555,7 @@ def cancel_rental(rental_id):
             refund_status = "NONE"
     
     db.session.commit()
+    availability_index.remove_booking(rental.vehicle_id, rental.id)
     
     return jsonify({
         "success": True,
@@ -382,22 +578,27 @@ def get_active_rentals():
     
     # Query for active rentals
     query = Rental.query.filter_by(
-        user_id=user_id,
+        user_id=parse_user_id(user_id),
         status="ACTIVE"
     ).order_by(Rental.start_date.desc())
     
-    # Paginate results
-    rentals_page = query.paginate(page=page, per_page=per_page)
-    
-    # Format response
-    rentals = []
-    for rental in rentals_page.items:
-        rentals.append(format_rental_list_item(rental))
-    
-    return jsonify({
-        "success": True,
-        "rentals": rentals,
-        "pagination": {
+    # Select only the columns the list renders (optionally narrowed with ?fields=)
+    try:
+        serializer = requested_serializer(serializers.rental_list_item)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    query, serializer = project_rental_list(query, serializer, 'start_date')
+    
+    # Cursor mode: seek on (start_date, id) instead of OFFSET + COUNT
+    if wants_cursor():
+        try:
+            rentals_page = keyset_paginate_request(query, Rental.start_date, descending=True)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        pagination = rentals_page.to_dict()
+    else:
+        rentals_page = query.paginate(page=page, per_page=per_page)
+        pagination = {
             "total": rentals_page.total,
             "pages": rentals_page.pages,
             "current_page": page,
@@ -405,6 +606,19 @@ def get_active_rentals():
             "has_next": rentals_page.has_next,
             "has_prev": rentals_page.has_prev
         }
+    
+    # Answer 304 without rendering the page when the client's copy is current
+    not_modified = check_not_modified(rental_list_validators(rentals_page.items, serializer, pagination))
+    if not_modified:
+        return not_modified
+    
+    # Format response
+    rentals = serializer.many(rentals_page.items)
+    
+    return jsonify({
+        "success": True,
+        "rentals": rentals,
+        "pagination": pagination
     }), 200
 
 @rental_bp.route("/upcoming", methods=["GET"])
@@ -422,23 +636,28 @@ def get_upcoming_rentals():
     
     # Query for upcoming rentals (approved but not yet started)
     query = Rental.query.filter(
-        Rental.user_id == user_id,
+        Rental.user_id == parse_user_id(user_id),
         Rental.status == "APPROVED",
         Rental.start_date > now
     ).order_by(Rental.start_date.asc())
     
-    # Paginate results
-    rentals_page = query.paginate(page=page, per_page=per_page)
-    
-    # Format response
-    rentals = []
-    for rental in rentals_page.items:
-        rentals.append(format_rental_list_item(rental))
-    
-    return jsonify({
-        "success": True,
-        "rentals": rentals,
-        "pagination": {
+    # Select only the columns the list renders (optionally narrowed with ?fields=)
+    try:
+        serializer = requested_serializer(serializers.rental_list_item)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    query, serializer = project_rental_list(query, serializer, 'start_date')
+    
+    # Cursor mode: seek on (start_date, id) instead of OFFSET + COUNT
+    if wants_cursor():
+        try:
+            rentals_page = keyset_paginate_request(query, Rental.start_date)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        pagination = rentals_page.to_dict()
+    else:
+        rentals_page = query.paginate(page=page, per_page=per_page)
+        pagination = {
             "total": rentals_page.total,
             "pages": rentals_page.pages,
             "current_page": page,
@@ -446,6 +665,19 @@ def get_upcoming_rentals():
             "has_next": rentals_page.has_next,
             "has_prev": rentals_page.has_prev
         }
+    
+    # Answer 304 without rendering the page when the client's copy is current
+    not_modified = check_not_modified(rental_list_validators(rentals_page.items, serializer, pagination))
+    if not_modified:
+        return not_modified
+    
+    # Format response
+    rentals = serializer.many(rentals_page.items)
+    
+    return jsonify({
+        "success": True,
+        "rentals": rentals,
+        "pagination": pagination
     }), 200
 
 @rental_bp.route("/past", methods=["GET"])
@@ -467,7 +699,7 @@ def get_past_rentals():
     
     # Build query for past rentals (completed or cancelled)
     query = Rental.query.filter(
-        Rental.user_id == user_id,
+        Rental.user_id == parse_user_id(user_id),
         Rental.status.in_(["COMPLETED", "CANCELLED"])
     )
     
@@ -477,18 +709,23 @@ def get_past_rentals():
     else:
         query = query.order_by(getattr(Rental, sort_field).desc())
     
-    # Paginate results
-    rentals_page = query.paginate(page=page, per_page=per_page)
-    
-    # Format response
-    rentals = []
-    for rental in rentals_page.items:
-        rentals.append(format_rental_list_item(rental))
-    
-    return jsonify({
-        "success": True,
-        "rentals": rentals,
-        "pagination": {
+    # Select only the columns the list renders (optionally narrowed with ?fields=)
+    try:
+        serializer = requested_serializer(serializers.rental_list_item)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    query, serializer = project_rental_list(query, serializer, sort_field)
+    
+    # Cursor mode: seek on (sort field, id) instead of OFFSET + COUNT
+    if wants_cursor():
+        try:
+            rentals_page = keyset_paginate_request(query, getattr(Rental, sort_field), descending=sort_order.lower() != 'asc')
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        pagination = rentals_page.to_dict()
+    else:
+        rentals_page = query.paginate(page=page, per_page=per_page)
+        pagination = {
             "total": rentals_page.total,
             "pages": rentals_page.pages,
             "current_page": page,
@@ -496,6 +733,19 @@ def get_past_rentals():
             "has_next": rentals_page.has_next,
             "has_prev": rentals_page.has_prev
         }
+    
+    # Answer 304 without rendering the page when the client's copy is current
+    not_modified = check_not_modified(rental_list_validators(rentals_page.items, serializer, pagination))
+    if not_modified:
+        return not_modified
+    
+    # Format response
+    rentals = serializer.many(rentals_page.items)
+    
+    return jsonify({
+        "success": True,
+        "rentals": rentals,
+        "pagination": pagination
     }), 200
 
 # Admin Routes
@@ -516,44 +766,38 @@ def get_pending_rentals():
     query = Rental.query.filter_by(status="PENDING_APPROVAL").order_by(Rental.booking_date.asc())
     
     # Check if admin is station master - only show rentals for their station
-    user_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
-    
-    if role == RoleEnum.STATION_MASTER.value:
-        admin = Admin.query.get(user_id)
-        if admin and admin.station_id:
+    auth = current_auth()
+    
+    if auth.is_station_master:
+        # The station comes from the token; tokens issued before it was a claim must be renewed
+        if "station_id" not in auth.claims:
+            return jsonify({"error": "Token is missing station information, please log in again"}), 401
+        station_id = auth.claims["station_id"]
+        if station_id:
             query = query.filter(
                 or_(
-                    Rental.pickup_station_id == admin.station_id,
-                    Rental.return_station_id == admin.station_id
+                    Rental.pickup_station_id == station_id,
+                    Rental.return_station_id == station_id
                 )
             )
     
-    # Paginate results
-    rentals_page = query.paginate(page=page, per_page=per_page)
-    
-    # Format response
-    rentals = []
-    for rental in rentals_page.items:
-        rental_data = format_rental_list_item(rental)
-        
-        # Add user info for admin view
-        user = User.query.get(rental.user_id)
-        if user:
-            rental_data["user"] = {
-                "id": str(user.id),
-                "name": f"{user.first_name} {user.last_name}",
-                "email": user.email,
-                "phone": user.phone
-            }
-        
-        rentals.append(rental_data)
-    
-    return jsonify({
-        "success": True,
-        "rentals": rentals,
-        "pagination": {
+    # Select only the columns the list renders (optionally narrowed with ?fields=)
+    try:
+        serializer = requested_serializer(serializers.rental_admin_list_item)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    query, serializer = project_rental_list(query, serializer, 'booking_date')
+    
+    # Cursor mode: seek on (booking_date, id) instead of OFFSET + COUNT
+    if wants_cursor():
+        try:
+            rentals_page = keyset_paginate_request(query, Rental.booking_date)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        pagination = rentals_page.to_dict()
+    else:
+        rentals_page = query.paginate(page=page, per_page=per_page)
+        pagination = {
             "total": rentals_page.total,
             "pages": rentals_page.pages,
             "current_page": page,
@@ -561,6 +805,19 @@ def get_pending_rentals():
             "has_next": rentals_page.has_next,
             "has_prev": rentals_page.has_prev
         }
+    
+    # Answer 304 without rendering the page when the client's copy is current
+    not_modified = check_not_modified(rental_list_validators(rentals_page.items, serializer, pagination))
+    if not_modified:
+        return not_modified
+    
+    # Format response
+    rentals = serializer.many(rentals_page.items)
+    
+    return jsonify({
+        "success": True,
+        "rentals": rentals,
+        "pagination": pagination
     }), 200
 
 @rental_bp.route("/<rental_id>/approve", methods=["PUT"])
@@ -617,6 +874,10 @@ def decline_rental(rental_id):
     if rental.status != "PENDING_APPROVAL":
         return jsonify({"error": f"Cannot decline rental with status: {rental.status}"}), 400
     
+    # A declined booking gives its discount code use back
+    if rental.promotion_id:
+        promotions.release(rental.promotion_id, rental.user_id)
+    
     # Update rental status
     rental.status = "DECLINED"
     rental.approved_by = admin_id
@@ -625,6 +886,7 @@ def decline_rental(rental_id):
     rental.updated_at = datetime.now(timezone.utc)
     
     db.session.commit()
+    availability_index.remove_booking(rental.vehicle_id, rental.id)
     
     return jsonify({
         "success": True,
@@ -647,7 +909,7 @@ def start_rental(rental_id):
     
     # Check authorization
     is_admin = is_admin_authorized()
-    if not is_admin and rental.user_id != user_id:
+    if not is_admin and not is_rental_owner(rental, user_id):
         return jsonify({"error": "Unauthorized to start this rental"}), 403
     
     # Check if rental status is valid for starting
@@ -655,7 +917,7 @@ def start_rental(rental_id):
         return jsonify({"error": f"Cannot start rental with status: {rental.status}"}), 400
     
     # Get vehicle
-    vehicle = Vehicle.query.get(rental.vehicle_id)
+    vehicle = rental.vehicle
     if not vehicle:
         return jsonify({"error": "Vehicle not found"}), 404
     
@@ -663,19 +925,48 @@ def start_rental(rental_id):
     if vehicle.status != "AVAILABLE":
         return jsonify({"error": f"Vehicle is not available (current status: {vehicle.status})"}), 400
     
-    # Update rental
-    rental.status = "ACTIVE"
-    rental.actual_start_date = datetime.now(timezone.utc)
-    rental.initial_charge_level = data.get("initial_charge_level")
-    rental.initial_odometer = data.get("initial_odometer")
-    rental.pre_rental_inspection = data.get("pre_rental_inspection")
-    rental.updated_at = datetime.now(timezone.utc)
+    now = datetime.now(timezone.utc)
     
-    # Update vehicle status
-    vehicle.status = "RENTED"
-    vehicle.updated_at = datetime.now(timezone.utc)
+    # Claim the rental and the vehicle with compare-and-swap updates so two
+    # concurrent requests cannot both start it or hand out the same vehicle
+    try:
+        rental_claimed = Rental.query.filter(
+            Rental.id == rental.id,
+            Rental.status == "APPROVED"
+        ).update({
+            Rental.status: "ACTIVE",
+            Rental.actual_start_date: now,
+            Rental.initial_charge_level: data.get("initial_charge_level"),
+            Rental.initial_odometer: data.get("initial_odometer"),
+            Rental.pre_rental_inspection: data.get("pre_rental_inspection"),
+            Rental.updated_at: now
+        }, synchronize_session=False)
+        
+        vehicle_claimed = Vehicle.query.filter(
+            Vehicle.id == vehicle.id,
+            Vehicle.status == "AVAILABLE"
+        ).update({
+            Vehicle.status: "RENTED",
+            Vehicle.booking_version: Vehicle.booking_version + 1,
+            Vehicle.updated_at: now
+        }, synchronize_session=False)
+        
+        if not rental_claimed or not vehicle_claimed:
+            db.session.rollback()
+            return jsonify({"error": "Rental or vehicle was updated by another request, please retry"}), 409
+        
+        db.session.commit()
+    except OperationalError:
+        db.session.rollback()
+        return jsonify({"error": "Rental is being updated by another request, please retry"}), 503
     
-    db.session.commit()
+    # The bulk update bypasses ORM events
+    vehicle_cache.invalidate(vehicle.id)
+    
+    # Reload the committed values
+    db.session.refresh(rental)
+    db.session.refresh(vehicle)
+    index_vehicle(vehicle)
     
     return jsonify({
         "success": True,
@@ -699,7 +990,7 @@ def complete_rental(rental_id):
     
     # Check authorization
     is_admin = is_admin_authorized()
-    if not is_admin and rental.user_id != user_id:
+    if not is_admin and not is_rental_owner(rental, user_id):
         return jsonify({"error": "Unauthorized to complete this rental"}), 403
     
     # Check if rental status is valid for completion
@@ -707,36 +998,76 @@ def complete_rental(rental_id):
         return jsonify({"error": f"Cannot complete rental with status: {rental.status}"}), 400
     
     # Get vehicle
-    vehicle = Vehicle.query.get(rental.vehicle_id)
+    vehicle = rental.vehicle
     if not vehicle:
         return jsonify({"error": "Vehicle not found"}), 404
     
-    # Calculate additional charges if any
-    additional_charges = []
-    
-    # Check for late return
     now = datetime.now(timezone.utc)
-    if now > rental.end_date:
-        hours_late = (now - rental.end_date).total_seconds() / 3600
-        late_fee = hours_late * vehicle.hourly_rate * 1.5  # 150% of hourly rate
-        
-        if late_fee > 0:
-            additional_charges.append({
-                "type": "LATE_RETURN",
-                "description": f"Late return fee ({int(hours_late)} hours)",
-                "amount": late_fee
-            })
-    
-    # Check for battery charge difference
+    
     final_charge_level = data.get("final_charge_level")
-    if final_charge_level is not None and rental.initial_charge_level is not None:
-        charge_difference = rental.initial_charge_level - final_charge_level
-        if charge_difference > 20:  # More than 20% battery used
-            recharge_fee = (charge_difference - 20) * 0.5  # $0.50 per % over 20%
-            additional_charges.append({
-                "type": "RECHARGE_FEE",
-                "description": f"Battery recharge fee ({int(charge_difference)}% used)",
-                "amount": recharge_fee
-            })
-    
-    # Calculate distance traveled
\ No newline at end of file
+    final_odometer = data.get("final_odometer")
+    post_rental_inspection = data.get("post_rental_inspection")
+    
+    # Settle late return, recharge, distance and damage charges
+    settled = settlement.settle(settlement.SettlementInput(
+        rental.id, rental.start_date, rental.end_date, now, vehicle.hourly_rate,
+        rental.initial_charge_level, final_charge_level,
+        rental.initial_odometer, final_odometer,
+        rental.pre_rental_inspection, post_rental_inspection
+    ))
+    
+    additional_charges = settlement.merge_charges(rental.additional_charges, settled)
+    
+    # Complete the rental with a compare-and-swap update so a concurrent
+    # request cannot complete it twice and return the vehicle twice
+    try:
+        rental_completed = Rental.query.filter(
+            Rental.id == rental.id,
+            Rental.status == "ACTIVE"
+        ).update({
+            Rental.status: "COMPLETED",
+            Rental.actual_end_date: now,
+            Rental.final_charge_level: final_charge_level,
+            Rental.final_odometer: final_odometer,
+            Rental.post_rental_inspection: post_rental_inspection,
+            Rental.additional_charges: additional_charges,
+            Rental.total_cost: settlement.total_cost(rental, settled),
+            Rental.updated_at: now
+        }, synchronize_session=False)
+        
+        if not rental_completed:
+            db.session.rollback()
+            return jsonify({"error": "Rental was updated by another request, please retry"}), 409
+        
+        # Return the vehicle to the return station
+        Vehicle.query.filter(Vehicle.id == vehicle.id).update({
+            Vehicle.status: "AVAILABLE",
+            Vehicle.station_id: rental.return_station_id,
+            Vehicle.total_rentals: func.coalesce(Vehicle.total_rentals, 0) + 1,
+            Vehicle.total_distance: func.coalesce(Vehicle.total_distance, 0) + settled.distance,
+            Vehicle.updated_at: now
+        }, synchronize_session=False)
+        
+        db.session.commit()
+    except OperationalError:
+        db.session.rollback()
+        return jsonify({"error": "Rental is being updated by another request, please retry"}), 503
+    
+    # The bulk updates bypass ORM events
+    vehicle_cache.invalidate(vehicle.id)
+    availability_index.remove_booking(rental.vehicle_id, rental.id)
+    
+    # Reload the committed values
+    db.session.refresh(rental)
+    db.session.refresh(vehicle)
+    index_vehicle(vehicle)
+    
+    return jsonify({
+        "success": True,
+        "message": "Rental completed successfully",
+        "rental_id": rental.id,
+        "status": rental.status,
+        "actual_end_date": rental.actual_end_date.isoformat() if rental.actual_end_date else None,
+        "additional_charges": rental.additional_charges or [],
+        "total_cost": rental.total_cost
+    }), 200
@@ -1,8 +1,18 @@
 from flask import Blueprint, request, jsonify
+from sqlalchemy.orm import joinedload
 from app.models import db
 from app.models.station import Station
 from app.models.admin import Admin, RoleEnum
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app import serializers
+from app.services.authz import current_auth, is_admin_authorized
+from app.services.spatial_index import GridIndex
+from app.utils import geo
+from app.utils.conditional import check_not_modified, entity_validators, page_validators
+from app.utils.pagination import InvalidCursor, KeysetPage, MAX_PER_PAGE, decode_cursor, encode_cursor
+from app.utils.pagination import keyset_paginate_request, wants_cursor
+from app.utils.projection import project, requested_serializer
+from flask_jwt_extended import jwt_required, get_jwt_identity
+import math
 import uuid
 from datetime import datetime
 import json
@@ -10,17 +20,31 @@ import json
 # Create blueprint
 station_bp = Blueprint('station', __name__, url_prefix='/api/station')
 
-# Helper function to check if the current user has admin permissions
-def is_admin_authorized(required_roles=None):
-    jwt_data = get_jwt()
-    role = jwt_data.get("role", None)
-    
-    # If no specific roles required, just check if user has any admin role
-    if not required_roles:
-        return role in [r.value for r in RoleEnum]
-    
-    # Check if user's role is in the required roles list
-    return role in [r.value for r in required_roles]
+# Spatial index over station coordinates used by the nearest-station search
+def station_attrs(station):
+    return {
+        "is_active": station.is_active,
+        "available_spots": station.available_spots or 0,
+        "charging_stations": station.charging_stations or 0
+    }
+
+def load_station_locations():
+    rows = db.session.query(
+        Station.id, Station.latitude, Station.longitude,
+        Station.is_active, Station.available_spots, Station.charging_stations
+    ).all()
+    return [(row.id, row.latitude, row.longitude, station_attrs(row)) for row in rows]
+
+# Stations are sparse compared to vehicles, so use coarser cells
+station_index = GridIndex(load_station_locations, cell_size=0.5)
+
+# Keep the spatial index in sync after a station was created or changed
+def index_station(station):
+    station_index.upsert(station.id, station.latitude, station.longitude, station_attrs(station))
+
+# Format station data for list views
+def format_station_summary(station):
+    return serializers.station_summary(station)
 
 @station_bp.route("/create", methods=["POST"])
 @jwt_required()
@@ -73,6 +97,7 @@ def create_station():
     
     db.session.add(new_station)
     db.session.commit()
+    index_station(new_station)
     
     return jsonify({
         "success": True,
@@ -80,6 +105,46 @@ def create_station():
         "station_id": new_station.id
     }), 201
 
+# Cursors of station lists ordered by distance from the requested location
+DISTANCE_SORT_KEY = "distance:asc"
+
+# Helper function to page through station rows nearest first, keeping those within
+# radius_km. Ties are ordered by id, so cursor mode can seek past the last
+# (distance, id) like keyset pagination does. Returns the page's (distance, row)
+# pairs and its pagination block
+def paginate_by_distance(rows, latitude, longitude, radius_km, page, per_page):
+    ranked = geo.sort_by_distance(
+        latitude, longitude,
+        [row.latitude for row in rows],
+        [row.longitude for row in rows],
+        radius_km
+    )
+    ranked = sorted(((distance, rows[i]) for i, distance in ranked), key=lambda pair: (pair[0], pair[1].id))
+    total = len(ranked)
+    
+    if wants_cursor():
+        per_page = max(1, min(per_page, MAX_PER_PAGE))
+        cursor = request.args.get('cursor')
+        if cursor:
+            last_distance, last_id = decode_cursor(cursor, DISTANCE_SORT_KEY)
+            ranked = [pair for pair in ranked if (pair[0], pair[1].id) > (last_distance, last_id)]
+        has_next = len(ranked) > per_page
+        ranked = ranked[:per_page]
+        next_cursor = encode_cursor(DISTANCE_SORT_KEY, ranked[-1][0], ranked[-1][1].id) if has_next else None
+        include_total = request.args.get("include_total", "false").lower() == "true"
+        return ranked, KeysetPage(ranked, per_page, has_next, next_cursor, total if include_total else None).to_dict()
+    
+    pages = math.ceil(total / per_page) if per_page > 0 else 0
+    offset = (page - 1) * per_page
+    return ranked[offset:offset + per_page], {
+        "total": total,
+        "pages": pages,
+        "current_page": page,
+        "per_page": per_page,
+        "has_next": page < pages,
+        "has_prev": page > 1
+    }
+
 @station_bp.route("/list", methods=["GET"])
 @jwt_required()
 def list_stations():
@@ -101,55 +166,161 @@ def list_stations():
         is_active = is_active.lower() == 'true'
         query = query.filter(Station.is_active == is_active)
     
-    # Check if the user is a station master, if so, show only their stations
-    admin_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
+    # Optional location filter: restrict to the bounding box of the radius in SQL
+    latitude = request.args.get('latitude', type=float)
+    longitude = request.args.get('longitude', type=float)
+    radius = request.args.get('radius', type=float)
+    has_location = latitude is not None and longitude is not None
+    if has_location and radius:
+        box = geo.bounding_box(latitude, longitude, radius)
+        query = query.filter(*geo.bounding_box_filter(Station.latitude, Station.longitude, box))
     
-    if role == RoleEnum.STATION_MASTER.value:
-        query = query.filter(Station.station_master_id == admin_id)
+    # Check if the user is a station master, if so, show only their stations
+    auth = current_auth()
+    
+    if auth.is_station_master:
+        query = query.filter(Station.station_master_id == auth.identity)
+    
+    # Select only the columns the list renders (optionally narrowed with ?fields=);
+    # the coordinates are always needed for the distance
+    try:
+        serializer = requested_serializer(serializers.station_summary)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    extra = ["id", "updated_at", "latitude", "longitude"] if has_location else ["id", "updated_at"]
+    query, serializer = project(query, serializer, Station, extra=extra)
+    
+    # With a radius, rank the stations in the box by great-circle distance (the
+    # box's corners lie beyond the radius) and page through them nearest first
+    distances = None
+    if has_location and radius:
+        try:
+            ranked, pagination = paginate_by_distance(query.all(), latitude, longitude, radius, page, per_page)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        items = [row for _, row in ranked]
+        distances = [distance for distance, _ in ranked]
+    # Cursor mode seeks on id instead of OFFSET + COUNT
+    elif wants_cursor():
+        try:
+            stations_page = keyset_paginate_request(query, Station.id)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        items = stations_page.items
+        pagination = stations_page.to_dict()
+    else:
+        stations_page = query.paginate(page=page, per_page=per_page)
+        items = stations_page.items
+        pagination = {
+            "total": stations_page.total,
+            "pages": stations_page.pages,
+            "current_page": page,
+            "per_page": per_page,
+            "has_next": stations_page.has_next,
+            "has_prev": stations_page.has_prev
+        }
     
-    # Paginate results
-    stations_page = query.paginate(page=page, per_page=per_page)
+    # Answer 304 without rendering the page when the client's copy is current
+    not_modified = check_not_modified(page_validators(items, ["updated_at"], pagination))
+    if not_modified:
+        return not_modified
     
     # Format response
+    stations = serializer.many(items)
+    
+    # Add the distance from the requested location, computed for the whole page at once
+    if has_location and stations:
+        if distances is None:
+            distances = geo.haversine_many(
+                latitude, longitude,
+                [station.latitude for station in items],
+                [station.longitude for station in items]
+            )
+        for station_data, distance in zip(stations, distances):
+            station_data["distance"] = round(float(distance), 2)
+    
+    return jsonify({
+        "success": True,
+        "stations": stations,
+        "pagination": pagination
+    }), 200
+
+@station_bp.route("/nearby", methods=["GET"])
+@jwt_required()
+def nearby_stations():
+    """Find the k nearest active stations to a given location"""
+    latitude = request.args.get('latitude', type=float)
+    longitude = request.args.get('longitude', type=float)
+    
+    if latitude is None or longitude is None:
+        return jsonify({"error": "Latitude and longitude are required"}), 400
+    
+    # k stations per page, nearest first
+    k = min(max(request.args.get('k', 10, type=int), 1), 100)
+    page = max(request.args.get('page', 1, type=int), 1)
+    radius = request.args.get('radius', type=float)  # Optional cut-off in km
+    
+    require_spots = request.args.get('has_available_spots', 'false').lower() == 'true'
+    require_charging = request.args.get('has_charging', 'false').lower() == 'true'
+    
+    def matches(attrs):
+        if not attrs["is_active"]:
+            return False
+        if require_spots and attrs["available_spots"] <= 0:
+            return False
+        if require_charging and attrs["charging_stations"] <= 0:
+            return False
+        return True
+    
+    # Fetch the page's candidates and re-check them, since the index may lag
+    # behind writes from other workers (a station deactivated or filled up);
+    # stale entries are refreshed so later pages don't offer them again
+    def load_matching(candidates):
+        if not candidates:
+            return {}
+        station_ids = [station_id for _, station_id in candidates]
+        loaded = {station.id: station for station in Station.query.filter(Station.id.in_(station_ids)).all()}
+        stations_by_id = {}
+        for station_id in station_ids:
+            station = loaded.get(station_id)
+            if station is None:
+                station_index.remove(station_id)
+            elif matches(station_attrs(station)):
+                stations_by_id[station_id] = station
+            else:
+                index_station(station)
+        return stations_by_id
+    
+    # Ask the index for one extra station to know whether another page exists;
+    # a stale candidate dropped by the re-check is replaced by the next one
+    offset = (page - 1) * k
+    wanted = offset + k + 1
+    while True:
+        nearest = station_index.nearest(latitude, longitude, wanted, matches, max_radius_km=radius)
+        candidates = nearest[offset:]
+        stations_by_id = load_matching(candidates)
+        dropped = len(candidates) - len(stations_by_id)
+        if len(stations_by_id) > k or len(nearest) < wanted or not dropped:
+            break
+        wanted += dropped
+    
+    page_matches = [(distance, station_id) for distance, station_id in candidates if station_id in stations_by_id]
+    
     stations = []
-    for station in stations_page.items:
-        stations.append({
-            "id": station.id,
-            "name": station.name,
-            "address": {
-                "street": station.street,
-                "city": station.city,
-                "state": station.state,
-                "zip_code": station.zip_code,
-                "country": station.country
-            },
-            "location": {
-                "latitude": station.latitude,
-                "longitude": station.longitude
-            },
-            "contact": {
-                "phone": station.contact_phone,
-                "email": station.contact_email
-            },
-            "capacity": station.capacity,
-            "available_spots": station.available_spots,
-            "charging_stations": station.charging_stations,
-            "is_active": station.is_active,
-            "created_at": station.created_at.isoformat() if station.created_at else None
-        })
+    for distance, station_id in page_matches[:k]:
+        station_data = format_station_summary(stations_by_id[station_id])
+        station_data["distance"] = round(distance, 2)  # Distance in km
+        stations.append(station_data)
     
     return jsonify({
         "success": True,
+        "count": len(stations),
         "stations": stations,
         "pagination": {
-            "total": stations_page.total,
-            "pages": stations_page.pages,
             "current_page": page,
-            "per_page": per_page,
-            "has_next": stations_page.has_next,
-            "has_prev": stations_page.has_prev
+            "k": k,
+            "has_next": len(page_matches) > k,
+            "has_prev": page > 1
         }
     }), 200
 
@@ -157,58 +328,29 @@ def list_stations():
 @jwt_required()
 def get_station(station_id):
     """Get a specific station by ID"""
-    station = Station.query.get(station_id)
+    station = Station.query.options(joinedload(Station.station_master)).filter(Station.id == station_id).first()
     
     if not station:
         return jsonify({"error": "Station not found"}), 404
     
     # Check if user has permission to view this station
-    admin_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
+    auth = current_auth()
     
     # If user is a station master, they can only view their own stations
-    if role == RoleEnum.STATION_MASTER.value and station.station_master_id != admin_id:
+    if auth.is_station_master and station.station_master_id != auth.identity:
         return jsonify({"error": "Unauthorized. You can only view your assigned stations."}), 403
     
+    # Answer 304 without rendering when the client's copy is current
+    not_modified = check_not_modified(entity_validators(station, station.station_master))
+    if not_modified:
+        return not_modified
+    
     # Format the station data
-    station_data = {
-        "id": station.id,
-        "name": station.name,
-        "address": {
-            "street": station.street,
-            "city": station.city,
-            "state": station.state,
-            "zip_code": station.zip_code,
-            "country": station.country
-        },
-        "location": {
-            "latitude": station.latitude,
-            "longitude": station.longitude
-        },
-        "contact": {
-            "phone": station.contact_phone,
-            "email": station.contact_email
-        },
-        "operating_hours": station.operating_hours,
-        "capacity": station.capacity,
-        "available_spots": station.available_spots,
-        "charging_stations": station.charging_stations,
-        "station_master_id": station.station_master_id,
-        "is_active": station.is_active,
-        "created_at": station.created_at.isoformat() if station.created_at else None,
-        "updated_at": station.updated_at.isoformat() if station.updated_at else None
-    }
+    station_data = serializers.station_detail(station)
     
     # If station has a station master, include their basic info
-    if station.station_master_id:
-        station_master = Admin.query.get(station.station_master_id)
-        if station_master:
-            station_data["station_master"] = {
-                "id": station_master.id,
-                "name": f"{station_master.first_name} {station_master.last_name}",
-                "email": station_master.email
-            }
+    if station.station_master_id and station.station_master:
+        station_data["station_master"] = serializers.station_master_brief(station.station_master)
     
     return jsonify({
         "success": True,
@@ -225,17 +367,15 @@ def update_station(station_id):
         return jsonify({"error": "Station not found"}), 404
     
     # Check if user has permission to update this station
-    admin_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
+    auth = current_auth()
     
     # Only SUPER_ADMIN can update any station
     # STATION_MASTER can only update their assigned stations
-    if role == RoleEnum.STATION_MASTER.value and station.station_master_id != admin_id:
+    if auth.is_station_master and station.station_master_id != auth.identity:
         return jsonify({"error": "Unauthorized. You can only update your assigned stations."}), 403
     
     # For other roles than SUPER_ADMIN/STATION_MASTER, deny access
-    if role not in [RoleEnum.SUPER_ADMIN.value, RoleEnum.STATION_MASTER.value]:
+    if not auth.has_role([RoleEnum.SUPER_ADMIN, RoleEnum.STATION_MASTER]):
         return jsonify({"error": "Unauthorized. Insufficient permissions."}), 403
     
     data = request.get_json()
@@ -285,7 +425,7 @@ def update_station(station_id):
         station.is_active = data["is_active"]
     
     # Only SUPER_ADMIN can change the station master
-    if "station_master_id" in data and role == RoleEnum.SUPER_ADMIN.value:
+    if "station_master_id" in data and auth.has_role([RoleEnum.SUPER_ADMIN]):
         # Validate that the assigned station master exists
         if data["station_master_id"]:
             station_master = Admin.query.filter_by(id=data["station_master_id"]).first()
@@ -297,6 +437,7 @@ def update_station(station_id):
     station.updated_at = datetime.utcnow()
     
     db.session.commit()
+    index_station(station)
     
     return jsonify({
         "success": True,
@@ -322,6 +463,7 @@ def delete_station(station_id):
     station.updated_at = datetime.utcnow()
     
     db.session.commit()
+    index_station(station)
     
     return jsonify({
         "success": True,
@@ -338,13 +480,11 @@ def update_availability(station_id):
         return jsonify({"error": "Station not found"}), 404
     
     # Check if user has permission to update this station
-    admin_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
+    auth = current_auth()
     
     # SUPER_ADMIN, STATION_MASTER of this station, and SUPPORT_STAFF can update availability
-    if (role == RoleEnum.STATION_MASTER.value and station.station_master_id != admin_id and 
-        role not in [RoleEnum.SUPER_ADMIN.value, RoleEnum.SUPPORT_STAFF.value]):
+    if (auth.is_station_master and station.station_master_id != auth.identity and 
+        not auth.has_role([RoleEnum.SUPER_ADMIN, RoleEnum.SUPPORT_STAFF])):
         return jsonify({"error": "Unauthorized. You can only update availability for your assigned stations."}), 403
     
     data = request.get_json()
@@ -360,6 +500,7 @@ def update_availability(station_id):
     station.updated_at = datetime.utcnow()
     
     db.session.commit()
+    index_station(station)
     
     return jsonify({
         "success": True,
@@ -1,99 +1,57 @@
 from flask import Blueprint, request, jsonify
 from sqlalchemy import func
+from sqlalchemy.orm import joinedload, undefer
 from app.models import db
 from app.models.vehicle import Vehicle
-from app.models.station import Station
 from app.models.admin import Admin, RoleEnum
-from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
+from app import serializers
+from app.services.authz import current_auth, is_admin_authorized
+from app.services.entity_cache import station_cache
+from app.services.spatial_index import GridIndex
+from app.utils import geo
+from app.utils.conditional import check_not_modified, entity_validators, page_validators
+from app.utils.pagination import InvalidCursor, keyset_paginate_request, wants_cursor
+from app.utils.projection import project, requested_serializer
+from flask_jwt_extended import jwt_required
 import uuid
-from datetime import datetime
+from datetime import datetime, timezone
 import json
-import math
 
 # Create blueprint
 vehicle_bp = Blueprint('vehicle', __name__,url_prefix='/api/vehicle')
 
-
-
-# Helper function to check if the current user has admin permissions
-def is_admin_authorized(required_roles=None):
-    jwt_data = get_jwt()
-    role = jwt_data.get("role", None)
-    
-    # If no specific roles required, just check if user has any admin role
-    if not required_roles:
-        return role in [r.value for r in RoleEnum]
-    
-    # Check if user's role is in the required roles list
-    return role in [r.value for r in required_roles]
-
 @vehicle_bp.route("/", methods=["GET"])
 def test_vehicle_route():
     return jsonify({"message": "Vehicle routes are working!"}), 200
 
-# Calculate distance between two coordinates using Haversine formula
-def calculate_distance(lat1, lon1, lat2, lon2):
-    # Convert coordinates from degrees to radians
-    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
-    
-    # Haversine formula
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a))
-    r = 6371  # Radius of Earth in kilometers
-    return c * r
+# Spatial index over vehicle coordinates used by the nearby search
+def load_vehicle_locations():
+    rows = db.session.query(
+        Vehicle.id, Vehicle.latitude, Vehicle.longitude, Vehicle.status, Vehicle.vehicle_type
+    ).all()
+    return [
+        (row.id, row.latitude, row.longitude, {"status": row.status, "vehicle_type": row.vehicle_type})
+        for row in rows
+    ]
+
+vehicle_index = GridIndex(load_vehicle_locations)
+
+# Keep the spatial index in sync after a vehicle was created, moved or changed status
+def index_vehicle(vehicle):
+    vehicle_index.upsert(
+        vehicle.id,
+        vehicle.latitude,
+        vehicle.longitude,
+        {"status": vehicle.status, "vehicle_type": vehicle.vehicle_type}
+    )
 
 # Format vehicle data for response
 def format_vehicle_data(vehicle, include_station=False):
-    vehicle_data = {
-        "id": vehicle.id,
-        "model": vehicle.model,
-        "vin_number": vehicle.vin_number,
-        "vehicle_type": vehicle.vehicle_type,
-        "battery_capacity": vehicle.battery_capacity,
-        "range": vehicle.range,
-        "status": vehicle.status,
-        "location": {
-            "latitude": vehicle.latitude,
-            "longitude": vehicle.longitude,
-        },
-        "station_id": vehicle.station_id,
-        "pricing": {
-            "hourly_rate": vehicle.hourly_rate,
-            "daily_rate": vehicle.daily_rate,
-            "weekly_rate": vehicle.weekly_rate,
-            "security_deposit": vehicle.security_deposit_amount
-        },
-        "image_urls": vehicle.image_urls,
-        "stats": {
-            "total_rentals": vehicle.total_rentals,
-            "total_distance": vehicle.total_distance
-        },
-        "min_loyalty_tier": vehicle.min_loyalty_tier,
-        "created_at": vehicle.created_at.isoformat() if vehicle.created_at else None,
-        "updated_at": vehicle.updated_at.isoformat() if vehicle.updated_at else None
-    }
+    vehicle_data = serializers.vehicle_detail(vehicle)
     
     # Include station details if requested
-    if include_station and vehicle.station_id:
-        station = Station.query.get(vehicle.station_id)
-        if station:
-            vehicle_data["station"] = {
-                "id": station.id,
-                "name": station.name,
-                "address": {
-                    "street": station.street,
-                    "city": station.city,
-                    "state": station.state,
-                    "zip_code": station.zip_code,
-                    "country": station.country
-                },
-                "location": {
-                    "latitude": station.latitude,
-                    "longitude": station.longitude
-                }
-            }
+    if include_station and vehicle.station_id and vehicle.station:
+        vehicle_data["station"] = serializers.station_brief(vehicle.station)
     
     return vehicle_data
 
@@ -124,16 +82,14 @@ def create_vehicle():
     
     # Validate station_id if provided
     if data.get("station_id"):
-        station = Station.query.get(data.get("station_id"))
+        station = station_cache.get(data.get("station_id"))
         if not station:
             return jsonify({"error": "Station not found"}), 404
             
         # If user is a STATION_MASTER, they can only add vehicles to their own station
-        admin_id = get_jwt_identity()
-        jwt_data = get_jwt()
-        role = jwt_data.get("role")
+        auth = current_auth()
         
-        if role == RoleEnum.STATION_MASTER.value and station.station_master_id != admin_id:
+        if auth.is_station_master and station.station_master_id != auth.identity:
             return jsonify({"error": "Unauthorized. You can only add vehicles to your assigned station."}), 403
     
     # Create new vehicle
@@ -154,12 +110,13 @@ def create_vehicle():
         security_deposit_amount=data.get("security_deposit_amount"),
         image_urls=data.get("image_urls", []),
         min_loyalty_tier=data.get("min_loyalty_tier", "BASIC"),
-        created_at=datetime.now(),
-        updated_at=datetime.now()
+        created_at=datetime.now(timezone.utc),
+        updated_at=datetime.now(timezone.utc)
     )
     
     db.session.add(new_vehicle)
     db.session.commit()
+    index_vehicle(new_vehicle)
     
     return jsonify({
         "success": True,
@@ -203,29 +160,29 @@ def list_vehicles():
     if min_loyalty_tier:
         query = query.filter(Vehicle.min_loyalty_tier == min_loyalty_tier.upper())
     
-    # Check if the user is a station master, if so, only show vehicles at their station
-    admin_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
-    
-    if role == RoleEnum.STATION_MASTER.value:
-        # Get the station managed by this admin
-        station = Station.query.filter_by(station_master_id=admin_id).first()
-        if station:
-            query = query.filter(Vehicle.station_id == station.id)
-    
-    # Paginate results
-    vehicles_page = query.paginate(page=page, per_page=per_page)
-    
-    # Format response
-    vehicles = []
-    for vehicle in vehicles_page.items:
-        vehicles.append(format_vehicle_data(vehicle))
-    
-    return jsonify({
-        "success": True,
-        "vehicles": vehicles,
-        "pagination": {
+    # Check if the user is a station master, if so, only show vehicles at their stations
+    auth = current_auth()
+    
+    if auth.is_station_master and auth.managed_station_ids:
+        query = query.filter(Vehicle.station_id.in_(auth.managed_station_ids))
+    
+    # Select only the columns the list renders (optionally narrowed with ?fields=)
+    try:
+        serializer = requested_serializer(serializers.vehicle_detail)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    query, serializer = project(query, serializer, Vehicle, extra=["id", "updated_at"])
+    
+    # Cursor mode: seek on id instead of OFFSET + COUNT
+    if wants_cursor():
+        try:
+            vehicles_page = keyset_paginate_request(query, Vehicle.id)
+        except InvalidCursor as e:
+            return jsonify({"error": str(e)}), 400
+        pagination = vehicles_page.to_dict()
+    else:
+        vehicles_page = query.paginate(page=page, per_page=per_page)
+        pagination = {
             "total": vehicles_page.total,
             "pages": vehicles_page.pages,
             "current_page": page,
@@ -233,28 +190,44 @@ def list_vehicles():
             "has_next": vehicles_page.has_next,
             "has_prev": vehicles_page.has_prev
         }
+    
+    # Answer 304 without rendering the page when the client's copy is current
+    not_modified = check_not_modified(page_validators(vehicles_page.items, ["updated_at"], pagination))
+    if not_modified:
+        return not_modified
+    
+    # Format response
+    vehicles = serializer.many(vehicles_page.items)
+    
+    return jsonify({
+        "success": True,
+        "vehicles": vehicles,
+        "pagination": pagination
     }), 200
 
 @vehicle_bp.route("/<vehicle_id>", methods=["GET"])
 @jwt_required()
 def get_vehicle(vehicle_id):
     """Get details of a specific vehicle"""
-    vehicle = Vehicle.query.get(vehicle_id)
+    vehicle = Vehicle.query.options(
+        undefer(Vehicle.image_urls), joinedload(Vehicle.station)
+    ).filter(Vehicle.id == vehicle_id).first()
     
     if not vehicle:
         return jsonify({"error": "Vehicle not found"}), 404
     
-    # If user is a station master, they can only view vehicles at their station
-    admin_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
+    # If user is a station master, they can only view vehicles at their stations
+    auth = current_auth()
     
-    if role == RoleEnum.STATION_MASTER.value:
-        # Get the station managed by this admin
-        station = Station.query.filter_by(station_master_id=admin_id).first()
-        if not station or vehicle.station_id != station.id:
+    if auth.is_station_master:
+        if not auth.manages_station(vehicle.station_id):
             return jsonify({"error": "Unauthorized. You can only view vehicles at your assigned station."}), 403
     
+    # Answer 304 without rendering when the client's copy is current
+    not_modified = check_not_modified(entity_validators(vehicle, vehicle.station))
+    if not_modified:
+        return not_modified
+    
     return jsonify({
         "success": True,
         "vehicle": format_vehicle_data(vehicle, include_station=True)
@@ -269,38 +242,69 @@ def nearby_vehicles():
     longitude = request.args.get('longitude', type=float)
     radius = request.args.get('radius', 5.0, type=float)  # Default 5km radius
     
-    if not latitude or not longitude:
+    if latitude is None or longitude is None:
         return jsonify({"error": "Latitude and longitude are required"}), 400
     
     # Get additional filters
     vehicle_type = request.args.get('type')
     status = request.args.get('status', 'AVAILABLE')  # Default to available vehicles
-    
-    # Base query
-    query = Vehicle.query
-    
-    # Apply filters
-    if vehicle_type:
-        query = query.filter(Vehicle.vehicle_type == vehicle_type.upper())
-    
-    if status:
-        query = query.filter(Vehicle.status == status.upper())
-    
-    # Get all vehicles that match filters
-    vehicles = query.all()
-    
-    # Filter by distance (would be more efficient with PostGIS or similar, but this works for SQLite)
+    limit = request.args.get('limit', type=int)
+    
+    vehicle_type = vehicle_type.upper() if vehicle_type else None
+    status = status.upper() if status else None
+    
+    def matches(attrs):
+        if vehicle_type and attrs["vehicle_type"] != vehicle_type:
+            return False
+        if status and attrs["status"] != status:
+            return False
+        return True
+    
+    box = geo.bounding_box(latitude, longitude, radius)
+    
+    # Fetch the candidates, bounded by the search box in SQL, and re-check
+    # them since the index may lag behind writes from other workers
+    def load_matching(matches_by_distance):
+        if not matches_by_distance:
+            return []
+        vehicle_ids = [vehicle_id for _, vehicle_id in matches_by_distance]
+        return [
+            vehicle for vehicle in Vehicle.query.options(undefer(Vehicle.image_urls)).filter(
+                Vehicle.id.in_(vehicle_ids),
+                *geo.bounding_box_filter(Vehicle.latitude, Vehicle.longitude, box)
+            ).all()
+            if matches({"status": vehicle.status, "vehicle_type": vehicle.vehicle_type})
+        ]
+    
+    # Look up candidates in the spatial index instead of scanning every vehicle
+    if limit:
+        # Stale entries take a slot and are then dropped by the re-check, so ask
+        # the index for one more candidate per dropped row until limit rows
+        # survive or it has no more to offer
+        wanted = limit
+        while True:
+            matches_by_distance = vehicle_index.nearest(latitude, longitude, wanted, matches, max_radius_km=radius)
+            vehicles = load_matching(matches_by_distance)
+            if len(vehicles) >= limit or len(matches_by_distance) < wanted:
+                break
+            wanted = limit + len(matches_by_distance) - len(vehicles)
+    else:
+        vehicles = load_matching(vehicle_index.within_radius(latitude, longitude, radius, matches))
+    
+    # Score the surviving rows in one vectorized call, nearest first
+    ranked = geo.sort_by_distance(
+        latitude, longitude,
+        [vehicle.latitude for vehicle in vehicles],
+        [vehicle.longitude for vehicle in vehicles],
+        radius
+    )
+    if limit:
+        ranked = ranked[:limit]
     nearby_vehicles = []
-    for vehicle in vehicles:
-        if vehicle.latitude and vehicle.longitude:
-            distance = calculate_distance(latitude, longitude, vehicle.latitude, vehicle.longitude)
-            if distance <= radius:
-                vehicle_data = format_vehicle_data(vehicle)
-                vehicle_data['distance'] = round(distance, 2)  # Add distance in km
-                nearby_vehicles.append(vehicle_data)
-    
-    # Sort by distance
-    nearby_vehicles.sort(key=lambda x: x['distance'])
+    for i, distance in ranked:
+        vehicle_data = format_vehicle_data(vehicles[i])
+        vehicle_data['distance'] = round(distance, 2)  # Add distance in km
+        nearby_vehicles.append(vehicle_data)
     
     return jsonify({
         "success": True,
@@ -340,17 +344,14 @@ def update_vehicle(vehicle_id):
         return jsonify({"error": "Vehicle not found"}), 404
     
     # Check permissions
-    admin_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
+    auth = current_auth()
     
     # SUPER_ADMIN can update any vehicle
-    # STATION_MASTER can only update vehicles at their station
-    if role == RoleEnum.STATION_MASTER.value:
-        station = Station.query.filter_by(station_master_id=admin_id).first()
-        if not station or vehicle.station_id != station.id:
+    # STATION_MASTER can only update vehicles at their stations
+    if auth.is_station_master:
+        if not auth.manages_station(vehicle.station_id):
             return jsonify({"error": "Unauthorized. You can only update vehicles at your assigned station."}), 403
-    elif role not in [RoleEnum.SUPER_ADMIN.value]:
+    elif not auth.has_role([RoleEnum.SUPER_ADMIN]):
         return jsonify({"error": "Unauthorized. Insufficient permissions."}), 403
     
     data = request.get_json()
@@ -392,9 +393,9 @@ def update_vehicle(vehicle_id):
         vehicle.longitude = data["longitude"]
     
     # Only SUPER_ADMIN can change which station a vehicle belongs to
-    if "station_id" in data and role == RoleEnum.SUPER_ADMIN.value:
+    if "station_id" in data and auth.has_role([RoleEnum.SUPER_ADMIN]):
         if data["station_id"]:
-            station = Station.query.get(data["station_id"])
+            station = station_cache.get(data["station_id"])
             if not station:
                 return jsonify({"error": "Station not found"}), 404
         vehicle.station_id = data["station_id"]
@@ -421,9 +422,10 @@ def update_vehicle(vehicle_id):
         vehicle.min_loyalty_tier = data["min_loyalty_tier"]
     
     # Update timestamp
-    vehicle.updated_at = datetime.now()
+    vehicle.updated_at = datetime.now(timezone.utc)
     
     db.session.commit()
+    index_vehicle(vehicle)
     
     return jsonify({
         "success": True,
@@ -441,16 +443,13 @@ def update_vehicle_status(vehicle_id):
         return jsonify({"error": "Vehicle not found"}), 404
     
     # Check permissions
-    admin_id = get_jwt_identity()
-    jwt_data = get_jwt()
-    role = jwt_data.get("role")
+    auth = current_auth()
     
     # SUPER_ADMIN, STATION_MASTER of this station, and SUPPORT_STAFF can update vehicle status
-    if role == RoleEnum.STATION_MASTER.value:
-        station = Station.query.filter_by(station_master_id=admin_id).first()
-        if not station or vehicle.station_id != station.id:
+    if auth.is_station_master:
+        if not auth.manages_station(vehicle.station_id):
             return jsonify({"error": "Unauthorized. You can only update vehicles at your assigned station."}), 403
-    elif role not in [RoleEnum.SUPER_ADMIN.value, RoleEnum.SUPPORT_STAFF.value]:
+    elif not auth.has_role([RoleEnum.SUPER_ADMIN, RoleEnum.SUPPORT_STAFF]):
         return jsonify({"error": "Unauthorized. Insufficient permissions."}), 403
     
     data = request.get_json()
@@ -464,9 +463,10 @@ def update_vehicle_status(vehicle_id):
     
     # Update status and timestamp
     vehicle.status = data["status"]
-    vehicle.updated_at = datetime.now()
+    vehicle.updated_at = datetime.now(timezone.utc)
     
     db.session.commit()
+    index_vehicle(vehicle)
     
     return jsonify({
         "success": True,
@@ -490,9 +490,10 @@ def delete_vehicle(vehicle_id):
     
     # Soft delete - set status to OUT_OF_SERVICE
     vehicle.status = "OUT_OF_SERVICE"
-    vehicle.updated_at = datetime.now()
+    vehicle.updated_at = datetime.now(timezone.utc)
     
     db.session.commit()
+    index_vehicle(vehicle)
     
     return jsonify({
         "success": True,
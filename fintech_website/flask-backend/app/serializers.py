@@ -0,0 +1,209 @@
+"""
+Per-model response serializers.
+
+Datetime fields are emitted as datetime objects; the orjson JSON provider
+writes them in ISO 8601.
+"""
+from app.utils.serialization import Computed, Serializer
+
+
+# Stations
+
+STATION_ADDRESS = {
+    "street": "street",
+    "city": "city",
+    "state": "state",
+    "zip_code": "zip_code",
+    "country": "country"
+}
+
+STATION_LOCATION = {
+    "latitude": "latitude",
+    "longitude": "longitude"
+}
+
+# Nested under rentals and vehicles
+station_brief = Serializer({
+    "id": "id",
+    "name": "name",
+    "address": STATION_ADDRESS,
+    "location": STATION_LOCATION
+}, name="station_brief")
+
+station_summary = Serializer({
+    "id": "id",
+    "name": "name",
+    "address": STATION_ADDRESS,
+    "location": STATION_LOCATION,
+    "contact": {
+        "phone": "contact_phone",
+        "email": "contact_email"
+    },
+    "capacity": "capacity",
+    "available_spots": "available_spots",
+    "charging_stations": "charging_stations",
+    "is_active": "is_active",
+    "created_at": "created_at"
+}, name="station_summary")
+
+station_master_brief = Serializer({
+    "id": "id",
+    "name": lambda admin: f"{admin.first_name} {admin.last_name}",
+    "email": "email"
+}, name="station_master_brief")
+
+station_detail = Serializer({
+    "id": "id",
+    "name": "name",
+    "address": STATION_ADDRESS,
+    "location": STATION_LOCATION,
+    "contact": {
+        "phone": "contact_phone",
+        "email": "contact_email"
+    },
+    "operating_hours": "operating_hours",
+    "capacity": "capacity",
+    "available_spots": "available_spots",
+    "charging_stations": "charging_stations",
+    "station_master_id": "station_master_id",
+    "is_active": "is_active",
+    "created_at": "created_at",
+    "updated_at": "updated_at"
+}, name="station_detail")
+
+
+# Vehicles
+
+vehicle_detail = Serializer({
+    "id": "id",
+    "model": "model",
+    "vin_number": "vin_number",
+    "vehicle_type": "vehicle_type",
+    "battery_capacity": "battery_capacity",
+    "range": "range",
+    "status": "status",
+    "location": {
+        "latitude": "latitude",
+        "longitude": "longitude"
+    },
+    "station_id": "station_id",
+    "pricing": {
+        "hourly_rate": "hourly_rate",
+        "daily_rate": "daily_rate",
+        "weekly_rate": "weekly_rate",
+        "security_deposit": "security_deposit_amount"
+    },
+    "image_urls": "image_urls",
+    "stats": {
+        "total_rentals": "total_rentals",
+        "total_distance": "total_distance"
+    },
+    "min_loyalty_tier": "min_loyalty_tier",
+    "created_at": "created_at",
+    "updated_at": "updated_at"
+}, name="vehicle_detail")
+
+# Nested under rental details
+vehicle_brief = Serializer({
+    "id": "id",
+    "model": "model",
+    "vehicle_type": "vehicle_type",
+    "image_urls": "image_urls"
+}, name="vehicle_brief")
+
+
+# Rentals
+
+rental_detail = Serializer({
+    "id": "id",
+    "user_id": lambda rental: str(rental.user_id),
+    "vehicle_id": "vehicle_id",
+    "pickup_station_id": "pickup_station_id",
+    "return_station_id": "return_station_id",
+    "booking_date": "booking_date",
+    "start_date": "start_date",
+    "end_date": "end_date",
+    "actual_start_date": "actual_start_date",
+    "actual_end_date": "actual_end_date",
+    "status": "status",
+    "approved_by": "approved_by",
+    "approval_date": "approval_date",
+    "cancellation_reason": "cancellation_reason",
+    "total_cost": "total_cost",
+    "rental_cost": "rental_cost",
+    "additional_charges": "additional_charges",
+    "discount": "discount",
+    "discount_code": "discount_code",
+    "tax_amount": "tax_amount",
+    "payment_status": "payment_status",
+    "payment_id": "payment_id",
+    "pre_authorization_id": "pre_authorization_id",
+    "loyalty_points_earned": "loyalty_points_earned",
+    "created_at": "created_at",
+    "updated_at": "updated_at"
+}, name="rental_detail")
+
+# List items are rendered from projected rows (see RENTAL_LIST_COLUMNS in
+# routes/rental.py); vehicle_*, *_station_name and user_* are joined columns
+rental_list_item = Serializer({
+    "id": "id",
+    "vehicle": Computed(
+        lambda row: None if row.vehicle_ref is None else {
+            "id": row.vehicle_ref,
+            "model": row.vehicle_model,
+            "vehicle_type": row.vehicle_type,
+            "image_urls": row.vehicle_image
+        },
+        "vehicle_ref", "vehicle_model", "vehicle_type", "vehicle_image"
+    ),
+    "start_date": "start_date",
+    "end_date": "end_date",
+    "actual_start_date": "actual_start_date",
+    "actual_end_date": "actual_end_date",
+    "status": "status",
+    "pickup_station_name": "pickup_station_name",
+    "return_station_name": "return_station_name",
+    "total_cost": "total_cost",
+    "loyalty_points_earned": "loyalty_points_earned"
+}, name="rental_list_item")
+
+# Admin list items add the renter's contact details
+rental_admin_list_item = Serializer(dict(rental_list_item.spec, user=Computed(
+    lambda row: None if row.user_ref is None else {
+        "id": str(row.user_ref),
+        "name": f"{row.user_first_name} {row.user_last_name}",
+        "email": row.user_email,
+        "phone": row.user_phone
+    },
+    "user_ref", "user_first_name", "user_last_name", "user_email", "user_phone"
+)), name="rental_admin_list_item")
+
+
+# Promotions
+
+promotion_detail = Serializer({
+    "id": "id",
+    "code": "code",
+    "description": "description",
+    "discount_type": "discount_type",
+    "discount_value": "discount_value",
+    "max_discount": "max_discount",
+    "valid_from": "valid_from",
+    "valid_until": "valid_until",
+    "max_redemptions": "max_redemptions",
+    "max_redemptions_per_user": "max_redemptions_per_user",
+    "redemption_count": "redemption_count",
+    "is_active": "is_active",
+    "created_at": "created_at",
+    "updated_at": "updated_at"
+}, name="promotion_detail")
+
+# What a customer sees when checking a code
+promotion_terms = Serializer({
+    "code": "code",
+    "description": "description",
+    "discount_type": "discount_type",
+    "discount_value": "discount_value",
+    "max_discount": "max_discount",
+    "valid_until": "valid_until"
+}, name="promotion_terms")
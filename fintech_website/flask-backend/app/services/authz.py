@@ -0,0 +1,168 @@
+"""
+Authorization context shared by every blueprint. The role comes from the
+token's claims; the stations an admin manages (stations.station_master_id)
+are looked up once per request at most, through a short-TTL cache that is
+dropped whenever the ORM writes a station.
+"""
+import threading
+from cachetools import TTLCache
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.models import db
+from app.models.admin import RoleEnum
+from app.models.station import Station
+
+ADMIN_ROLES = frozenset(r.value for r in RoleEnum)
+
+
+class ManagedStationCache:
+    """Admin id -> frozenset of the ids of the stations they manage.
+
+    Entries expire after the TTL, which bounds how long another worker's
+    reassignment can go unseen; writes through this process's ORM drop the
+    entries of both the old and the new station master.
+    """
+
+    def __init__(self, ttl=60, maxsize=10000):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that raced one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, admin_id):
+        with self._lock:
+            station_ids = self._entries.get(admin_id)
+        if station_ids is not None:
+            self.hits += 1
+            return station_ids
+
+        self.misses += 1
+        generation = self._generation
+        station_ids = frozenset(
+            row.id for row in db.session.query(Station.id).filter(Station.station_master_id == admin_id)
+        )
+        with self._lock:
+            if generation == self._generation:
+                self._entries[admin_id] = station_ids
+        return station_ids
+
+    def invalidate(self, admin_ids=None):
+        """Drop the given admins' entries, or every entry when admin_ids is None"""
+        with self._lock:
+            self._generation += 1
+            if admin_ids is None:
+                self._entries.clear()
+            else:
+                for admin_id in admin_ids:
+                    self._entries.pop(admin_id, None)
+
+    def configure(self, ttl, maxsize):
+        with self._lock:
+            self._generation += 1
+            self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            size = len(self._entries)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "size": size
+        }
+
+
+managed_stations = ManagedStationCache()
+
+
+class AuthContext:
+    """Who the current request is made by, resolved from its token"""
+
+    def __init__(self, identity, claims):
+        self.identity = identity
+        self.claims = claims
+        self.role = claims.get("role")
+        self._station_ids = None
+
+    @property
+    def is_admin(self):
+        return self.role in ADMIN_ROLES
+
+    @property
+    def is_station_master(self):
+        return self.role == RoleEnum.STATION_MASTER.value
+
+    def has_role(self, roles=None):
+        """Any admin role when roles is empty, otherwise one of the given RoleEnums"""
+        if not roles:
+            return self.is_admin
+        return self.role in [r.value for r in roles]
+
+    @property
+    def managed_station_ids(self):
+        """Ids of the stations this admin is station master of (empty for everyone else)"""
+        if self._station_ids is None:
+            self._station_ids = managed_stations.get(self.identity) if self.is_admin else frozenset()
+        return self._station_ids
+
+    def manages_station(self, station_id):
+        return station_id is not None and station_id in self.managed_station_ids
+
+
+def current_auth():
+    """The AuthContext of the current request; call it from inside @jwt_required routes"""
+    auth = g.get("_auth_context")
+    if auth is None:
+        auth = g._auth_context = AuthContext(get_jwt_identity(), get_jwt())
+    return auth
+
+
+# Helper function to check if the current user has admin permissions
+def is_admin_authorized(required_roles=None):
+    return current_auth().has_role(required_roles)
+
+
+# Station writes can change who manages what: drop the old and the new
+# station master at flush and again after commit, like the entity cache
+def forget_station_masters(target, admin_ids):
+    admin_ids = set(admin_ids) - {None}
+    if not admin_ids:
+        return
+    managed_stations.invalidate(admin_ids)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("authz_pending", set()).update(admin_ids)
+
+
+@event.listens_for(Station, "after_insert")
+@event.listens_for(Station, "after_update")
+def on_station_write(mapper, connection, target):
+    history = inspect(target).attrs.station_master_id.history
+    forget_station_masters(target, [*history.added, *history.deleted])
+
+
+@event.listens_for(Station, "after_delete")
+def on_station_delete(mapper, connection, target):
+    forget_station_masters(target, [target.station_master_id])
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed(session):
+    admin_ids = session.info.pop("authz_pending", None)
+    if admin_ids:
+        managed_stations.invalidate(admin_ids)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_pending(session, previous_transaction):
+    session.info.pop("authz_pending", None)
+
+
+def init_authz(app):
+    """Size the managed-station cache from config"""
+    managed_stations.configure(ttl=app.config["AUTHZ_CACHE_TTL"], maxsize=app.config["AUTHZ_CACHE_MAXSIZE"])
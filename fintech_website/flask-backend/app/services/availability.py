@@ -0,0 +1,134 @@
+import threading
+from bisect import bisect_left
+from datetime import timezone
+from cachetools import TTLCache
+
+# Rental statuses that keep a vehicle busy for the booked period
+BLOCKING_STATUSES = ("PENDING_APPROVAL", "APPROVED", "ACTIVE")
+
+
+# Compare everything as naive UTC; SQLite hands back naive datetimes
+def to_naive_utc(value):
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+class VehicleTimeline:
+    """Booked [start, end) intervals of one vehicle, sorted by start.
+
+    ``max_ends[i]`` holds the latest end among the first i+1 intervals, so an
+    overlap check is a single bisect even if legacy data contains overlapping
+    bookings.
+    """
+
+    __slots__ = ("starts", "ends", "rental_ids", "max_ends")
+
+    def __init__(self, intervals=()):
+        intervals = sorted(intervals)
+        self.starts = [start for start, _, _ in intervals]
+        self.ends = [end for _, end, _ in intervals]
+        self.rental_ids = [rental_id for _, _, rental_id in intervals]
+        self.max_ends = []
+        self._rebuild_max_ends(0)
+
+    def _rebuild_max_ends(self, position):
+        del self.max_ends[position:]
+        latest = self.max_ends[-1] if self.max_ends else None
+        for end in self.ends[position:]:
+            latest = end if latest is None or end > latest else latest
+            self.max_ends.append(latest)
+
+    def is_free(self, start, end):
+        # Only intervals starting before `end` can overlap; of those, the one
+        # ending last decides
+        position = bisect_left(self.starts, end)
+        return position == 0 or self.max_ends[position - 1] <= start
+
+    def add(self, rental_id, start, end):
+        self.remove(rental_id)
+        position = bisect_left(self.starts, start)
+        self.starts.insert(position, start)
+        self.ends.insert(position, end)
+        self.rental_ids.insert(position, rental_id)
+        self._rebuild_max_ends(position)
+
+    def remove(self, rental_id):
+        if rental_id not in self.rental_ids:
+            return
+        position = self.rental_ids.index(rental_id)
+        del self.starts[position]
+        del self.ends[position]
+        del self.rental_ids[position]
+        self._rebuild_max_ends(position)
+
+
+class AvailabilityIndex:
+    """Per-process cache of vehicle timelines answering "is vehicle X free in [a, b)".
+
+    Timelines are loaded on demand through ``loader(vehicle_ids)``, which must
+    return (vehicle_id, rental_id, start, end) rows for blocking rentals, and
+    expire after ``ttl`` seconds so bookings made by other workers are picked
+    up. Bookings made in this process are applied immediately.
+    """
+
+    def __init__(self, loader, ttl=30, maxsize=50000):
+        self.loader = loader
+        self._timelines = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.RLock()
+
+    def _load(self, vehicle_ids):
+        """Return {vehicle_id: timeline}, loading missing or expired entries in one query"""
+        timelines = {}
+        with self._lock:
+            for vehicle_id in vehicle_ids:
+                timeline = self._timelines.get(vehicle_id)
+                if timeline is not None:
+                    timelines[vehicle_id] = timeline
+        missing = [vehicle_id for vehicle_id in vehicle_ids if vehicle_id not in timelines]
+        if not missing:
+            return timelines
+
+        intervals = {vehicle_id: [] for vehicle_id in missing}
+        for vehicle_id, rental_id, start, end in self.loader(missing):
+            intervals[vehicle_id].append((to_naive_utc(start), to_naive_utc(end), rental_id))
+
+        with self._lock:
+            for vehicle_id, vehicle_intervals in intervals.items():
+                timeline = VehicleTimeline(vehicle_intervals)
+                self._timelines[vehicle_id] = timeline
+                timelines[vehicle_id] = timeline
+        return timelines
+
+    def is_free(self, vehicle_id, start, end):
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        timeline = self._load([vehicle_id])[vehicle_id]
+        with self._lock:
+            return timeline.is_free(start, end)
+
+    def free_vehicles(self, vehicle_ids, start, end):
+        """Filter vehicle_ids down to the ones free for the whole window"""
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        vehicle_ids = list(dict.fromkeys(vehicle_ids))
+        timelines = self._load(vehicle_ids)
+        with self._lock:
+            return [vehicle_id for vehicle_id in vehicle_ids if timelines[vehicle_id].is_free(start, end)]
+
+    def add_booking(self, vehicle_id, rental_id, start, end):
+        with self._lock:
+            timeline = self._timelines.get(vehicle_id)
+            if timeline is not None:
+                timeline.add(rental_id, to_naive_utc(start), to_naive_utc(end))
+
+    def remove_booking(self, vehicle_id, rental_id):
+        with self._lock:
+            timeline = self._timelines.get(vehicle_id)
+            if timeline is not None:
+                timeline.remove(rental_id)
+
+    def invalidate(self, vehicle_id=None):
+        with self._lock:
+            if vehicle_id is None:
+                self._timelines.clear()
+            else:
+                self._timelines.pop(vehicle_id, None)
@@ -0,0 +1,207 @@
+import pickle
+import threading
+from cachetools import TTLCache
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.models import db
+from app.models.station import Station
+from app.models.vehicle import Vehicle
+
+
+class Snapshot(dict):
+    """Read-only copy of a row's column values, readable as attributes like the model.
+
+    Snapshots are shared between requests; treat them as immutable.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+class LocalCacheBackend:
+    """Process-local TTL + LRU store; the default backend and the stand-in for a shared one"""
+
+    def __init__(self, ttl=300, maxsize=10000):
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self, prefix):
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    def size(self, prefix):
+        with self._lock:
+            return sum(1 for key in self._entries if key.startswith(prefix))
+
+
+class RedisCacheBackend:
+    """Shared store, so every worker sees the same entries and invalidations.
+
+    Needs the redis package, which is only installed where a shared cache is configured.
+    """
+
+    def __init__(self, url, ttl=300):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("ENTITY_CACHE_URL is set but the redis package is not installed") from e
+        self._client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        value = self._client.get(key)
+        return None if value is None else pickle.loads(value)
+
+    def set(self, key, value):
+        self._client.set(key, pickle.dumps(value), ex=self.ttl)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def clear(self, prefix):
+        keys = list(self._client.scan_iter(match=prefix + "*"))
+        if keys:
+            self._client.delete(*keys)
+
+    def size(self, prefix):
+        return None
+
+
+class EntityCache:
+    """Read-through cache of one model's rows, keyed by primary key.
+
+    Misses are loaded with a single column query into a Snapshot; deferred
+    columns and the ones named in ``exclude`` (values that change without ORM
+    events) are left out. Entries are dropped when the ORM updates or deletes
+    the row (see ``watch``), and otherwise expire after the backend's TTL, which
+    bounds how long writes made by other workers can go unseen with the local
+    backend. Lookups of ids that don't exist are not cached.
+    """
+
+    def __init__(self, model, exclude=(), backend=None):
+        self.model = model
+        self.prefix = f"entity:{model.__tablename__}:"
+        self.backend = backend or LocalCacheBackend()
+        self._exclude = set(exclude)
+        self._columns = None
+        # Bumped by every invalidation; a load that raced one is not stored
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = [
+                getattr(self.model, prop.key) for prop in inspect(self.model).column_attrs
+                if not prop.deferred and prop.key not in self._exclude
+            ]
+        return self._columns
+
+    def _load(self, key):
+        primary_key = inspect(self.model).primary_key[0]
+        row = db.session.query(*self.columns).filter(primary_key == key).first()
+        return None if row is None else Snapshot(row._asdict())
+
+    def get(self, key):
+        """Snapshot of the row with this primary key, or None if there is none"""
+        if key is None:
+            return None
+        snapshot = self.backend.get(self.prefix + str(key))
+        if snapshot is not None:
+            self.hits += 1
+            return snapshot
+
+        self.misses += 1
+        generation = self._generation
+        snapshot = self._load(key)
+        if snapshot is not None and generation == self._generation:
+            self.backend.set(self.prefix + str(key), snapshot)
+        return snapshot
+
+    def invalidate(self, key=None):
+        """Drop one entry, or every entry of this model when key is None"""
+        self._generation += 1
+        self.invalidations += 1
+        if key is None:
+            self.backend.clear(self.prefix)
+        else:
+            self.backend.delete(self.prefix + str(key))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "invalidations": self.invalidations,
+            "size": self.backend.size(self.prefix)
+        }
+
+    def watch(self):
+        """Invalidate entries on ORM updates and deletes of the model.
+
+        The entry is dropped at flush and again after commit, since a request
+        reading between the two would cache the old row. Bulk query.update()
+        calls emit no per-row events; callers invalidate those themselves.
+        """
+        def on_change(mapper, connection, target):
+            key = inspect(target).identity[0]
+            self.invalidate(key)
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault("entity_cache_pending", set()).add((self, key))
+
+        event.listen(self.model, "after_update", on_change)
+        event.listen(self.model, "after_delete", on_change)
+        return self
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed(session):
+    for cache, key in session.info.pop("entity_cache_pending", ()):
+        cache.invalidate(key)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_pending(session, previous_transaction):
+    session.info.pop("entity_cache_pending", None)
+
+
+# booking_version is bumped by every booking through a bulk UPDATE
+vehicle_cache = EntityCache(Vehicle, exclude=("booking_version",)).watch()
+station_cache = EntityCache(Station).watch()
+
+CACHES = (vehicle_cache, station_cache)
+
+
+def init_entity_cache(app):
+    """Size the caches from config and pick the backend: local, or redis when ENTITY_CACHE_URL is set"""
+    for cache in CACHES:
+        if app.config["ENTITY_CACHE_URL"]:
+            cache.backend = RedisCacheBackend(app.config["ENTITY_CACHE_URL"], ttl=app.config["ENTITY_CACHE_TTL"])
+        else:
+            cache.backend = LocalCacheBackend(ttl=app.config["ENTITY_CACHE_TTL"], maxsize=app.config["ENTITY_CACHE_MAXSIZE"])
+
+
+def cache_stats():
+    return {cache.model.__tablename__: cache.stats() for cache in CACHES}
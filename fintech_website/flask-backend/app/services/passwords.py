@@ -0,0 +1,125 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import jsonify
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+# Werkzeug's own default: PBKDF2-HMAC-SHA256 with 260,000 iterations
+DEFAULT_METHOD = "pbkdf2:sha256:260000"
+
+
+def normalize_method(method):
+    """
+    The full "pbkdf2:<hash>:<iterations>" form stored in hashes for a method
+    such as "pbkdf2:sha256", filling in werkzeug's default iterations.
+    Raises ValueError for anything else.
+    """
+    name, _, params = method.partition(":")
+    algorithm, _, iterations = params.partition(":")
+    if name != "pbkdf2" or not algorithm:
+        raise ValueError(f"Unsupported password hash method {method!r}, expected pbkdf2:<hash>[:<iterations>]")
+    try:
+        hashlib.new(algorithm)
+    except ValueError:
+        raise ValueError(f"Unknown hash {algorithm!r} in password hash method {method!r}") from None
+    if not iterations:
+        iterations = DEFAULT_PBKDF2_ITERATIONS
+    elif not iterations.isdigit() or int(iterations) < 1:
+        raise ValueError(f"Iterations must be a positive integer in password hash method {method!r}")
+    return f"pbkdf2:{algorithm}:{int(iterations)}"
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when no hashing slot frees up in time; answer 503 and let the client retry"""
+
+
+class PasswordHasher:
+    """Password hashing and verification on a bounded pool of worker threads.
+
+    PBKDF2 runs inside OpenSSL with the GIL released, so the workers hash in
+    parallel while request threads only wait. At most `workers` hashes run at
+    once, which caps the CPU a login storm can take from other endpoints, and
+    at most `max_pending` more may queue; beyond that callers wait up to
+    `timeout` seconds for a slot and then get PasswordHasherBusy.
+
+    Hashes record their method and cost, so raising the cost only needs a new
+    `method`: existing hashes still verify and are upgraded on the next login
+    (see verify_and_update).
+    """
+
+    def __init__(self, method=DEFAULT_METHOD, workers=None, max_pending=64, timeout=5.0):
+        self._lock = threading.Lock()
+        self._executor = None
+        self.configure(method, workers, max_pending, timeout)
+
+    def configure(self, method=DEFAULT_METHOD, workers=None, max_pending=64, timeout=5.0):
+        self.method = normalize_method(method)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        self.timeout = timeout
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _pool(self):
+        # Created on first use, so every (forked) worker process gets its own threads
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+            return self._executor
+
+    def _run(self, fn, *args):
+        slots = self._slots
+        if not slots.acquire(timeout=self.timeout):
+            raise PasswordHasherBusy()
+        try:
+            return self._pool().submit(fn, *args).result()
+        finally:
+            slots.release()
+
+    def hash(self, password):
+        """Hash a password with the configured method"""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        """Check a password against a hash of any supported method or cost"""
+        if not pwhash or password is None:
+            return False
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Whether a hash was made with a method or cost other than the configured one"""
+        return pwhash.split("$", 1)[0] != self.method
+
+    def verify_and_update(self, pwhash, password):
+        """
+        Verify a password; returns (valid, new_hash). new_hash is set when the
+        password is valid but its hash is outdated, and should replace it.
+        """
+        if not self.verify(pwhash, password):
+            return False, None
+        if self.needs_rehash(pwhash):
+            return True, self.hash(password)
+        return True, None
+
+
+password_hasher = PasswordHasher()
+
+
+def init_password_hasher(app):
+    """Apply the PASSWORD_HASH_* settings to the shared hasher and answer 503 when it is saturated"""
+    password_hasher.configure(
+        method=app.config["PASSWORD_HASH_METHOD"],
+        workers=app.config["PASSWORD_HASH_WORKERS"],
+        max_pending=app.config["PASSWORD_HASH_MAX_PENDING"],
+        timeout=app.config["PASSWORD_HASH_TIMEOUT"]
+    )
+
+    @app.errorhandler(PasswordHasherBusy)
+    def password_hasher_busy(error):
+        response = jsonify({"success": False, "message": "Server is busy, please retry shortly"})
+        response.headers["Retry-After"] = "1"
+        return response, 503
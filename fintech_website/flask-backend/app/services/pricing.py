@@ -0,0 +1,128 @@
+import numpy as np
+
+# Tax applied to the discounted rental cost
+TAX_RATE = 0.1
+
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 168
+
+
+# Length of a rental in hours, as a float
+def rental_hours(start_date, end_date):
+    return (end_date - start_date).total_seconds() / 3600
+
+
+# Cost of one rental of the given length. Up to a day is billed per completed
+# hour (minimum 1), up to a week per completed day (minimum 1), and beyond that
+# per whole week plus a day rate for the remaining whole days
+def rental_cost(hourly_rate, daily_rate, weekly_rate, hours):
+    hourly_rate = hourly_rate or 0
+    daily_rate = daily_rate or 0
+    weekly_rate = weekly_rate or 0
+
+    if hours <= HOURS_PER_DAY:
+        return hourly_rate * max(1, int(hours))
+    elif hours <= HOURS_PER_WEEK:
+        return daily_rate * max(1, int(hours / HOURS_PER_DAY))
+    else:
+        weeks = int(hours / HOURS_PER_WEEK)
+        remaining_days = int((hours % HOURS_PER_WEEK) / HOURS_PER_DAY)
+        return (weekly_rate * weeks) + (daily_rate * remaining_days)
+
+
+# Price breakdown for a rental cost and discount
+def build_quote(rental_cost, discount=0):
+    tax_amount = (rental_cost - discount) * TAX_RATE
+    return {
+        "rental_cost": rental_cost,
+        "discount": discount,
+        "tax_amount": tax_amount,
+        "total_cost": rental_cost - discount + tax_amount
+    }
+
+
+# Rental lengths in hours for arrays of start and end datetimes
+# (datetime64 arrays, or sequences of naive UTC datetimes)
+def rental_hours_many(start_dates, end_dates):
+    starts = np.asarray(start_dates, dtype="datetime64[us]")
+    ends = np.asarray(end_dates, dtype="datetime64[us]")
+    # Whole microseconds to seconds, rounded exactly like timedelta.total_seconds()
+    return (ends - starts).astype(np.int64) / 1e6 / 3600
+
+
+# rental_cost() over arrays; the arguments broadcast against each other, so
+# rates shaped (n, 1) and hours shaped (m,) price every vehicle for every window
+def rental_cost_many(hourly_rates, daily_rates, weekly_rates, hours):
+    hours = np.asarray(hours, dtype=np.float64)
+    hourly = hourly_rates * np.maximum(1, np.trunc(hours))
+    daily = daily_rates * np.maximum(1, np.trunc(hours / HOURS_PER_DAY))
+    weekly = (
+        weekly_rates * np.trunc(hours / HOURS_PER_WEEK)
+        + daily_rates * np.trunc(np.remainder(hours, HOURS_PER_WEEK) / HOURS_PER_DAY)
+    )
+    return np.where(hours <= HOURS_PER_DAY, hourly, np.where(hours <= HOURS_PER_WEEK, daily, weekly))
+
+
+class Quotes:
+    """Price breakdowns computed together; each field is an array of the same shape"""
+
+    __slots__ = ("rental_cost", "discount", "tax_amount", "total_cost")
+
+    def __init__(self, rental_cost, discount_rate=0.0):
+        self.rental_cost = rental_cost
+        self.discount = rental_cost * discount_rate
+        self.tax_amount = (rental_cost - self.discount) * TAX_RATE
+        self.total_cost = rental_cost - self.discount + self.tax_amount
+
+    def to_dicts(self):
+        """One build_quote()-style dict per quote, for a 1-d batch"""
+        return [
+            {"rental_cost": rental_cost, "discount": discount, "tax_amount": tax_amount, "total_cost": total_cost}
+            for rental_cost, discount, tax_amount, total_cost in zip(
+                self.rental_cost.tolist(), self.discount.tolist(),
+                self.tax_amount.tolist(), self.total_cost.tolist()
+            )
+        ]
+
+
+class RateTable:
+    """Hourly, daily and weekly rates of many vehicles, precomputed as float arrays.
+
+    Missing rates count as 0, as in rental_cost(). Build it once for a set of
+    vehicles and price any number of windows against it.
+    """
+
+    __slots__ = ("vehicle_ids", "hourly", "daily", "weekly")
+
+    def __init__(self, vehicle_ids, hourly, daily, weekly):
+        self.vehicle_ids = list(vehicle_ids)
+        self.hourly = np.asarray(hourly, dtype=np.float64)
+        self.daily = np.asarray(daily, dtype=np.float64)
+        self.weekly = np.asarray(weekly, dtype=np.float64)
+
+    @classmethod
+    def from_vehicles(cls, vehicles):
+        vehicles = list(vehicles)
+        return cls(
+            [vehicle.id for vehicle in vehicles],
+            [vehicle.hourly_rate or 0 for vehicle in vehicles],
+            [vehicle.daily_rate or 0 for vehicle in vehicles],
+            [vehicle.weekly_rate or 0 for vehicle in vehicles]
+        )
+
+    def __len__(self):
+        return len(self.vehicle_ids)
+
+    def quote(self, hours, discount_rate=0.0):
+        """
+        Quotes pairing vehicle i with hours[i]; a scalar hours prices every
+        vehicle for the same window. discount_rate may be a scalar or an array.
+        """
+        return Quotes(rental_cost_many(self.hourly, self.daily, self.weekly, hours), discount_rate)
+
+    def quote_grid(self, hours, discount_rate=0.0):
+        """Quotes for every vehicle (rows) and every window length in hours (columns)"""
+        hours = np.asarray(hours, dtype=np.float64)[np.newaxis, :]
+        return Quotes(rental_cost_many(
+            self.hourly[:, np.newaxis], self.daily[:, np.newaxis], self.weekly[:, np.newaxis], hours
+        ), discount_rate)
@@ -0,0 +1,87 @@
+from datetime import datetime, timezone
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import db
+from app.models.promotion import Promotion, PromotionUsage, hash_code
+
+DISCOUNT_TYPES = ("PERCENT", "FIXED")
+
+
+class PromotionError(ValueError):
+    pass
+
+
+def find_promotion(code, at=None):
+    """
+    The active promotion for a discount code, valid at `at` (default now).
+    One lookup on the unique code_hash index; the usage caps are enforced
+    when redeeming. Raises PromotionError with a user-facing message.
+    """
+    at = at or datetime.now(timezone.utc)
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+
+    promotion = Promotion.query.filter(Promotion.code_hash == hash_code(code)).first()
+    if not promotion or not promotion.is_active:
+        raise PromotionError("Invalid discount code")
+    if promotion.valid_from and at < promotion.valid_from:
+        raise PromotionError("Discount code is not valid yet")
+    if promotion.valid_until and at >= promotion.valid_until:
+        raise PromotionError("Discount code has expired")
+    return promotion
+
+
+def discount_for(promotion, rental_cost):
+    """Amount taken off rental_cost; never more than the cost itself"""
+    if promotion.discount_type == "PERCENT":
+        discount = rental_cost * promotion.discount_value / 100
+        if promotion.max_discount is not None:
+            discount = min(discount, promotion.max_discount)
+    else:
+        discount = promotion.discount_value
+    return min(discount, rental_cost)
+
+
+def _upsert(table):
+    if db.session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def redeem(promotion, user_id):
+    """
+    Count one redemption against the promotion's global and per-user caps, in
+    the caller's transaction. Each counter moves with a single conditional
+    UPDATE (an upsert for the per-user row), so concurrent bookings can never
+    exceed a cap and no counter is read first. Returns False, leaving the
+    transaction for the caller to roll back, when a cap has been reached.
+    """
+    claimed = Promotion.query.filter(
+        Promotion.id == promotion.id,
+        or_(Promotion.max_redemptions.is_(None), Promotion.redemption_count < Promotion.max_redemptions)
+    ).update({Promotion.redemption_count: Promotion.redemption_count + 1}, synchronize_session=False)
+    if not claimed:
+        return False
+
+    usage = PromotionUsage.__table__
+    statement = _upsert(usage).values(promotion_id=promotion.id, user_id=user_id, redemption_count=1)
+    statement = statement.on_conflict_do_update(
+        index_elements=[usage.c.promotion_id, usage.c.user_id],
+        set_={"redemption_count": usage.c.redemption_count + 1},
+        where=None if promotion.max_redemptions_per_user is None
+        else usage.c.redemption_count < promotion.max_redemptions_per_user
+    )
+    return db.session.execute(statement).rowcount == 1
+
+
+def release(promotion_id, user_id):
+    """Give back a redemption of the promotion, e.g. when its booking is cancelled before it starts"""
+    Promotion.query.filter(
+        Promotion.id == promotion_id,
+        Promotion.redemption_count > 0
+    ).update({Promotion.redemption_count: Promotion.redemption_count - 1}, synchronize_session=False)
+    PromotionUsage.query.filter(
+        PromotionUsage.promotion_id == promotion_id,
+        PromotionUsage.user_id == user_id,
+        PromotionUsage.redemption_count > 0
+    ).update({PromotionUsage.redemption_count: PromotionUsage.redemption_count - 1}, synchronize_session=False)
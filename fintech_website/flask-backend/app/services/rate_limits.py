@@ -0,0 +1,182 @@
+"""
+Request rate limits on the routes that are expensive or abusable without an
+account: login and registration (password hashing), KYC initiation and
+payment orders (calls to outside services).
+
+Limits are Flask-Limiter strings such as "10 per minute;100 per hour" read
+from the app config, counted per route and per caller with the moving-window
+strategy, so a burst straddling a window boundary can't get twice the limit.
+Counters live in RATELIMIT_STORAGE_URI: local:// (LocalRateLimitStorage)
+keeps them per process, redis://host:6379 shares them between workers.
+"""
+import threading
+import time
+from collections import deque
+from functools import wraps
+from flask import current_app, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from jwt.exceptions import PyJWTError
+from limits.storage import MovingWindowSupport, Storage
+
+
+class LocalRateLimitStorage(Storage, MovingWindowSupport):
+    """Process-local counters, registered as the local:// storage scheme.
+
+    limits' own memory:// storage expires hits from a timer thread that walks
+    every hit of every key each 10 ms, a cost every request then shares. Here
+    a key's moving window is a deque of hit times trimmed when the key is
+    used, and keys whose window has emptied are dropped by a sweep at most
+    every SWEEP_INTERVAL seconds. Fixed-window counters are supported too.
+    """
+
+    STORAGE_SCHEME = ["local"]
+    SWEEP_INTERVAL = 60
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        # key -> (window length, deque of hit times, oldest first)
+        self._windows = {}
+        # key -> [count, expires_at]
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._next_sweep = time.time() + self.SWEEP_INTERVAL
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return ValueError
+
+    def _window(self, key, expiry, now):
+        entry = self._windows.get(key)
+        if entry is None:
+            entry = self._windows[key] = (expiry, deque())
+        hits = entry[1]
+        start = now - expiry
+        while hits and hits[0] < start:
+            hits.popleft()
+        return hits
+
+    def _sweep(self, now):
+        self._next_sweep = now + self.SWEEP_INTERVAL
+        for key, (expiry, hits) in list(self._windows.items()):
+            if not hits or hits[-1] < now - expiry:
+                del self._windows[key]
+        for key, (count, expires_at) in list(self._counters.items()):
+            if expires_at <= now:
+                del self._counters[key]
+
+    def acquire_entry(self, key, limit, expiry, amount=1):
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            hits = self._window(key, expiry, now)
+            if len(hits) + amount > limit:
+                return False
+            hits.extend([now] * amount)
+            return True
+
+    def get_moving_window(self, key, limit, expiry):
+        now = time.time()
+        with self._lock:
+            hits = self._window(key, expiry, now)
+            return (hits[0], len(hits)) if hits else (now, 0)
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._sweep(now)
+            counter = self._counters.get(key)
+            if counter is None or counter[1] <= now:
+                counter = self._counters[key] = [0, now + expiry]
+            elif elastic_expiry:
+                counter[1] = now + expiry
+            counter[0] += amount
+            return counter[0]
+
+    def get(self, key):
+        counter = self._counters.get(key)
+        return counter[0] if counter and counter[1] > time.time() else 0
+
+    def get_expiry(self, key):
+        counter = self._counters.get(key)
+        return counter[1] if counter else time.time()
+
+    def check(self):
+        return True
+
+    def reset(self):
+        with self._lock:
+            count = len(self._windows) + len(self._counters)
+            self._windows.clear()
+            self._counters.clear()
+            return count
+
+    def clear(self, key):
+        with self._lock:
+            self._windows.pop(key, None)
+            self._counters.pop(key, None)
+
+
+def client_key():
+    """The client's address (see TRUSTED_PROXY_COUNT when behind a proxy)"""
+    return f"ip:{get_remote_address()}"
+
+
+def identity_key():
+    """The token subject when the request carries a valid token, otherwise the client's address"""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except (JWTExtendedException, PyJWTError):
+        identity = None
+    return f"id:{identity}" if identity else client_key()
+
+
+def account_key():
+    """The email being logged into, so one account can't be guessed at from many addresses"""
+    data = request.get_json(silent=True)
+    email = data.get("email") if isinstance(data, dict) else None
+    return f"email:{str(email).strip().lower()}" if email else client_key()
+
+
+# Only the routes decorated with limit() are limited, so the limiter doesn't
+# look at every request from before_request (auto_check); limit() checks instead
+limiter = Limiter(key_func=client_key, auto_check=False)
+
+
+def limit(setting, key_func=client_key, methods=None):
+    """Decorator limiting a route to the rate in app.config[setting], counted per key_func value.
+
+    Stacked limit() decorators register their limits on the same view and
+    share one check of all of them.
+    """
+    def decorator(view):
+        limiter.limit(lambda: current_app.config[setting], key_func=key_func, methods=methods)(view)
+        if getattr(view, "rate_limited", False):
+            return view
+
+        @wraps(view)
+        def limited_view(*args, **kwargs):
+            limiter.check()
+            return view(*args, **kwargs)
+
+        limited_view.rate_limited = True
+        return limited_view
+    return decorator
+
+
+def init_rate_limits(app):
+    """Attach the limiter (configured by the RATELIMIT_* settings) and answer 429 in JSON"""
+    limiter.init_app(app)
+
+    @app.errorhandler(429)
+    def rate_limit_exceeded(error):
+        return jsonify({
+            "success": False,
+            "error": "Too many requests, please retry later",
+            "limit": str(error.description)
+        }), 429
@@ -0,0 +1,163 @@
+"""
+Revoked JWTs, keyed by their jti claim and forgotten once the token expires.
+
+MemoryRevocationStore is per process. DatabaseRevocationStore keeps the
+revocations in the revoked_tokens table so every worker sees them, with a
+memory store in front so tokens already known to be revoked skip the query.
+"""
+import heapq
+import threading
+import time
+from datetime import datetime, timezone
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import db
+from app.models.revoked_token import RevokedToken
+
+# Expiry times are rounded up to this many seconds, so all tokens expiring in
+# the same window share one bucket (and one int object)
+BUCKET_SECONDS = 60
+
+# How often the database store deletes expired rows, per process
+DATABASE_EVICT_INTERVAL = 300
+
+
+def _key(jti):
+    """
+    Raw bytes of hex jtis (16 for the UUIDs flask_jwt_extended issues, 32 for
+    token digests), else the encoded string. jtis are issued by this server,
+    so ignoring dashes and hex case can't make two of them collide.
+    """
+    try:
+        return bytes.fromhex(jti.replace("-", ""))
+    except ValueError:
+        return jti.encode()
+
+
+class MemoryRevocationStore:
+    """In-process revocations: a dict from jti to expiry bucket, O(1) to check.
+
+    Keys are raw bytes and each value is the shared int of its bucket, so an
+    entry costs a dict slot, a 16-byte bytes object and a list slot. Buckets
+    are evicted whole, oldest first, as revocations come in.
+    """
+
+    def __init__(self):
+        self._expiries = {}
+        self._buckets = {}
+        self._bucket_heap = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._expiries)
+
+    def add(self, jti, expires_at):
+        """Revoke a jti until expires_at (a unix timestamp)"""
+        now = time.time()
+        if expires_at <= now:
+            return
+        key = _key(jti)
+        bucket = -(-int(expires_at) // BUCKET_SECONDS) * BUCKET_SECONDS
+        with self._lock:
+            self._evict(now)
+            entry = self._buckets.get(bucket)
+            if entry is None:
+                entry = self._buckets[bucket] = (bucket, [])
+                heapq.heappush(self._bucket_heap, bucket)
+            bucket, keys = entry
+            if self._expiries.get(key) != bucket:
+                keys.append(key)
+            self._expiries[key] = bucket
+
+    def is_revoked(self, jti):
+        bucket = self._expiries.get(_key(jti))
+        return bucket is not None and bucket > time.time()
+
+    def evict(self):
+        with self._lock:
+            self._evict(time.time())
+
+    def _evict(self, now):
+        heap = self._bucket_heap
+        while heap and heap[0] <= now:
+            bucket, keys = self._buckets.pop(heapq.heappop(heap))
+            for key in keys:
+                if self._expiries.get(key) == bucket:
+                    del self._expiries[key]
+
+
+def _insert_ignore(table):
+    if db.session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def _naive_utc(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).replace(tzinfo=None)
+
+
+class DatabaseRevocationStore:
+    """Revocations shared by all workers through the revoked_tokens table.
+
+    A revoked jti is also remembered in a local MemoryRevocationStore, so
+    only tokens not known to be revoked cost a primary key lookup.
+    """
+
+    def __init__(self):
+        self._local = MemoryRevocationStore()
+        self._next_eviction = 0
+
+    def add(self, jti, expires_at):
+        """Revoke a jti until expires_at (a unix timestamp); commits with the caller's transaction"""
+        table = RevokedToken.__table__
+        db.session.execute(
+            _insert_ignore(table).values(jti=jti, expires_at=_naive_utc(expires_at)).on_conflict_do_nothing(
+                index_elements=[table.c.jti]
+            )
+        )
+        self._local.add(jti, expires_at)
+        if time.time() >= self._next_eviction:
+            self.evict()
+
+    def is_revoked(self, jti):
+        if self._local.is_revoked(jti):
+            return True
+        expires_at = db.session.query(RevokedToken.expires_at).filter(RevokedToken.jti == jti).scalar()
+        if expires_at is None:
+            return False
+        expires_at = expires_at.replace(tzinfo=timezone.utc).timestamp()
+        if expires_at <= time.time():
+            return False
+        self._local.add(jti, expires_at)
+        return True
+
+    def evict(self):
+        self._next_eviction = time.time() + DATABASE_EVICT_INTERVAL
+        RevokedToken.query.filter(
+            RevokedToken.expires_at <= _naive_utc(time.time())
+        ).delete(synchronize_session=False)
+        self._local.evict()
+
+
+revocation_store = MemoryRevocationStore()
+
+
+def revoke(jti, expires_at):
+    """Revoke a token by jti until expires_at (a unix timestamp, e.g. its exp claim)"""
+    revocation_store.add(jti, expires_at)
+
+
+def is_revoked(jti):
+    return revocation_store.is_revoked(jti)
+
+
+def init_token_revocation(app, jwt):
+    """Pick the store from TOKEN_REVOCATION_BACKEND and check it for every protected request"""
+    global revocation_store
+    if app.config["TOKEN_REVOCATION_BACKEND"] == "database":
+        revocation_store = DatabaseRevocationStore()
+    else:
+        revocation_store = MemoryRevocationStore()
+
+    @jwt.token_in_blocklist_loader
+    def check_if_token_revoked(jwt_header, jwt_payload):
+        return "jti" in jwt_payload and is_revoked(jwt_payload["jti"])
@@ -0,0 +1,226 @@
+"""
+End-of-rental charges: late return, battery recharge, distance over the
+included allowance, and damage found by comparing the pickup and return
+inspections.
+
+Everything is computed by one NumPy kernel over arrays of rentals. settle()
+prices a single rental by running the same kernel on a batch of one, so
+nightly reconciliation over thousands of rentals (settle_many) produces
+exactly the amounts charged at completion.
+
+Inspections are JSON objects with a "damages" list of {"area", "severity"}
+entries; a damage is charged when its area is new on return or its severity
+went up, by the difference between the severity fees.
+"""
+import math
+from datetime import timezone
+import numpy as np
+
+# 150% of the hourly rate for the time past the booked end, billed pro rata (90 minutes late is 1.5 hours)
+LATE_FEE_MULTIPLIER = 1.5
+
+# Battery use up to this many percentage points is included, the rest is billed per point
+RECHARGE_FREE_PERCENT = 20
+RECHARGE_FEE_PER_PERCENT = 0.5
+
+# Distance allowance per started day of the booked period, excess billed per km
+INCLUDED_KM_PER_DAY = 100
+EXCESS_KM_FEE = 0.2
+
+DAMAGE_FEES = {"MINOR": 50.0, "MODERATE": 200.0, "MAJOR": 1000.0}
+
+# additional_charges entries owned by settlement; anything else in the list is kept as is
+CHARGE_TYPES = ("LATE_RETURN", "RECHARGE_FEE", "DISTANCE_FEE", "DAMAGE")
+
+
+def _naive_utc(value):
+    if value is not None and value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _float(value):
+    return np.nan if value is None else float(value)
+
+
+def _damages(inspection):
+    """{area: severity fee} of an inspection; unknown severities are not billed"""
+    damages = {}
+    for damage in (inspection or {}).get("damages") or []:
+        fee = DAMAGE_FEES.get(str(damage.get("severity", "")).upper())
+        area = damage.get("area")
+        if fee is not None and area:
+            damages[area] = max(fee, damages.get(area, 0.0))
+    return damages
+
+
+def damage_diff(pre_inspection, post_inspection):
+    """Areas damaged during the rental, as [(area, fee)] sorted by area"""
+    before = _damages(pre_inspection)
+    after = _damages(post_inspection)
+    return sorted(
+        (area, fee - before.get(area, 0.0))
+        for area, fee in after.items()
+        if fee > before.get(area, 0.0)
+    )
+
+
+class SettlementInput:
+    """What settlement needs to know about one rental"""
+
+    __slots__ = (
+        "rental_id", "start_date", "end_date", "returned_at", "hourly_rate",
+        "initial_charge_level", "final_charge_level", "initial_odometer", "final_odometer",
+        "pre_rental_inspection", "post_rental_inspection"
+    )
+
+    def __init__(self, rental_id, start_date, end_date, returned_at, hourly_rate,
+                 initial_charge_level=None, final_charge_level=None,
+                 initial_odometer=None, final_odometer=None,
+                 pre_rental_inspection=None, post_rental_inspection=None):
+        self.rental_id = rental_id
+        self.start_date = _naive_utc(start_date)
+        self.end_date = _naive_utc(end_date)
+        self.returned_at = _naive_utc(returned_at)
+        self.hourly_rate = hourly_rate
+        self.initial_charge_level = initial_charge_level
+        self.final_charge_level = final_charge_level
+        self.initial_odometer = initial_odometer
+        self.final_odometer = final_odometer
+        self.pre_rental_inspection = pre_rental_inspection
+        self.post_rental_inspection = post_rental_inspection
+
+    @classmethod
+    def from_rental(cls, rental, hourly_rate, returned_at=None):
+        """Input from a rental's recorded return; returned_at defaults to actual_end_date"""
+        return cls(
+            rental.id, rental.start_date, rental.end_date, returned_at or rental.actual_end_date, hourly_rate,
+            rental.initial_charge_level, rental.final_charge_level,
+            rental.initial_odometer, rental.final_odometer,
+            rental.pre_rental_inspection, rental.post_rental_inspection
+        )
+
+
+class Settlement:
+    """Charges of one rental, in additional_charges format, and their total"""
+
+    __slots__ = ("rental_id", "charges", "total", "distance")
+
+    def __init__(self, rental_id, charges, total, distance):
+        self.rental_id = rental_id
+        self.charges = charges
+        self.total = total
+        self.distance = distance
+
+
+def _microseconds(values):
+    return np.array(values, dtype="datetime64[us]")
+
+
+# Per-rental charge amounts for arrays of inputs. Every operation is
+# element-wise, so a rental's amounts don't depend on the rest of the batch
+def charges_kernel(start, end, returned, hourly_rate, initial_charge, final_charge,
+                   initial_odometer, final_odometer, damage_fee):
+    # Seconds rounded exactly like timedelta.total_seconds()
+    hours_late = (returned - end).astype(np.int64) / 1e6 / 3600
+    late_fee = np.where(hours_late > 0, hours_late * hourly_rate * LATE_FEE_MULTIPLIER, 0.0)
+
+    charge_used = initial_charge - final_charge
+    recharge_fee = np.where(
+        charge_used > RECHARGE_FREE_PERCENT,
+        (charge_used - RECHARGE_FREE_PERCENT) * RECHARGE_FEE_PER_PERCENT,
+        0.0
+    )
+
+    distance = np.where(final_odometer >= initial_odometer, final_odometer - initial_odometer, 0.0)
+    booked_days = np.maximum(1, np.ceil((end - start).astype(np.int64) / (24 * 3600 * 1e6)))
+    excess_km = distance - booked_days * INCLUDED_KM_PER_DAY
+    distance_fee = np.where(excess_km > 0, excess_km * EXCESS_KM_FEE, 0.0)
+
+    total = late_fee + recharge_fee + distance_fee + damage_fee
+    return {
+        "hours_late": hours_late,
+        "late_fee": late_fee,
+        "charge_used": charge_used,
+        "recharge_fee": recharge_fee,
+        "distance": distance,
+        "excess_km": excess_km,
+        "distance_fee": distance_fee,
+        "total": total
+    }
+
+
+def settle_many(inputs):
+    """Settle a batch of SettlementInputs; returns one Settlement per input, in order"""
+    inputs = list(inputs)
+    if not inputs:
+        return []
+
+    damages = [damage_diff(item.pre_rental_inspection, item.post_rental_inspection) for item in inputs]
+    result = charges_kernel(
+        _microseconds([item.start_date for item in inputs]),
+        _microseconds([item.end_date for item in inputs]),
+        _microseconds([item.returned_at for item in inputs]),
+        np.array([item.hourly_rate or 0 for item in inputs], dtype=np.float64),
+        np.array([_float(item.initial_charge_level) for item in inputs]),
+        np.array([_float(item.final_charge_level) for item in inputs]),
+        np.array([_float(item.initial_odometer) for item in inputs]),
+        np.array([_float(item.final_odometer) for item in inputs]),
+        np.array([math.fsum(fee for _, fee in items) for items in damages], dtype=np.float64)
+    )
+    columns = {name: values.tolist() for name, values in result.items()}
+
+    settlements = []
+    for i, item in enumerate(inputs):
+        charges = []
+        if columns["late_fee"][i] > 0:
+            charges.append({
+                "type": "LATE_RETURN",
+                "description": f"Late return fee ({int(columns['hours_late'][i])} hours)",
+                "amount": columns["late_fee"][i],
+                "hourly_rate": item.hourly_rate
+            })
+        if columns["recharge_fee"][i] > 0:
+            charges.append({
+                "type": "RECHARGE_FEE",
+                "description": f"Battery recharge fee ({int(columns['charge_used'][i])}% used)",
+                "amount": columns["recharge_fee"][i]
+            })
+        if columns["distance_fee"][i] > 0:
+            charges.append({
+                "type": "DISTANCE_FEE",
+                "description": f"Distance over allowance ({int(columns['excess_km'][i])} km)",
+                "amount": columns["distance_fee"][i]
+            })
+        for area, fee in damages[i]:
+            charges.append({
+                "type": "DAMAGE",
+                "description": f"Damage: {area}",
+                "amount": fee
+            })
+        settlements.append(Settlement(item.rental_id, charges, columns["total"][i], columns["distance"][i]))
+    return settlements
+
+
+def settle(settlement_input):
+    """Settle one rental through the batch kernel, so it matches settle_many exactly"""
+    return settle_many([settlement_input])[0]
+
+
+def merge_charges(existing, settlement):
+    """additional_charges with the settlement's charges replacing any earlier ones"""
+    kept = [charge for charge in existing or [] if charge.get("type") not in CHARGE_TYPES]
+    return kept + settlement.charges
+
+
+def recorded_hourly_rate(rental, current_rate):
+    """The hourly rate a completed rental was settled with, if it paid a late fee"""
+    for charge in rental.additional_charges or []:
+        if charge.get("type") == "LATE_RETURN" and charge.get("hourly_rate") is not None:
+            return charge["hourly_rate"]
+    return current_rate
+
+
+def total_cost(rental, settlement):
+    """The rental's booked price (after discount and tax) plus its settled charges; fees are not taxed"""
+    return (rental.rental_cost or 0) - (rental.discount or 0) + (rental.tax_amount or 0) + settlement.total
@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from app.utils import geo
+
+
+class GridIndex:
+    """Fixed-size lat/lon grid over point entities.
+
+    Every entity lives in exactly one cell, so a radius query only has to look
+    at the cells overlapping the search box instead of every row. Entries carry
+    a small attribute dict (status, type, ...) so queries can filter without a
+    trip to the database.
+
+    The index is loaded lazily through ``loader`` and fully reloaded every
+    ``ttl`` seconds so that writes made by other worker processes show up;
+    writes made in this process are applied immediately via ``upsert`` and
+    ``remove``.
+    """
+
+    def __init__(self, loader, cell_size=0.05, ttl=60):
+        self.loader = loader  # callable returning (id, latitude, longitude, attrs) tuples
+        self.cell_size = cell_size  # degrees, ~5.5km of latitude
+        self.ttl = ttl
+        self._cells = {}
+        self._points = {}
+        self._loaded_at = None
+        self._lock = threading.RLock()
+
+    def _cell(self, latitude, longitude):
+        return (math.floor(latitude / self.cell_size), math.floor(longitude / self.cell_size))
+
+    def _insert(self, entity_id, latitude, longitude, attrs):
+        cell = self._cell(latitude, longitude)
+        self._points[entity_id] = (latitude, longitude, cell, attrs)
+        self._cells.setdefault(cell, set()).add(entity_id)
+
+    def _discard(self, entity_id):
+        point = self._points.pop(entity_id, None)
+        if point is None:
+            return
+        members = self._cells.get(point[2])
+        if members is not None:
+            members.discard(entity_id)
+            if not members:
+                del self._cells[point[2]]
+
+    def reload(self):
+        """Rebuild the index from the loader"""
+        rows = list(self.loader())
+        with self._lock:
+            self._cells = {}
+            self._points = {}
+            for entity_id, latitude, longitude, attrs in rows:
+                if latitude is not None and longitude is not None:
+                    self._insert(entity_id, latitude, longitude, attrs)
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Force a reload on the next query"""
+        with self._lock:
+            self._loaded_at = None
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or time.monotonic() - loaded_at > self.ttl:
+            self.reload()
+
+    def upsert(self, entity_id, latitude, longitude, attrs=None):
+        """Insert or move an entity; entities without coordinates are dropped"""
+        with self._lock:
+            if self._loaded_at is None:
+                # Nothing cached yet, the next query loads fresh data anyway
+                return
+            self._discard(entity_id)
+            if latitude is not None and longitude is not None:
+                self._insert(entity_id, latitude, longitude, attrs or {})
+
+    def remove(self, entity_id):
+        with self._lock:
+            self._discard(entity_id)
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._points)
+
+    def _candidate_cells(self, latitude, longitude, radius_km):
+        min_lat, max_lat, min_lon, max_lon = geo.bounding_box(latitude, longitude, radius_km)
+        min_row, min_col = self._cell(min_lat, min_lon)
+        max_row, max_col = self._cell(max_lat, max_lon)
+
+        # Fall back to scanning occupied cells when the box covers more cells than exist
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+            return [cell for cell in self._cells
+                    if min_row <= cell[0] <= max_row and min_col <= cell[1] <= max_col]
+        return [(row, col)
+                for row in range(min_row, max_row + 1)
+                for col in range(min_col, max_col + 1)]
+
+    def within_radius(self, latitude, longitude, radius_km, predicate=None):
+        """Return (distance_km, id) pairs within radius_km, nearest first"""
+        self._ensure_loaded()
+        ids, latitudes, longitudes = [], [], []
+        with self._lock:
+            for cell in self._candidate_cells(latitude, longitude, radius_km):
+                for entity_id in self._cells.get(cell, ()):
+                    point_lat, point_lon, _, attrs = self._points[entity_id]
+                    if predicate is not None and not predicate(attrs):
+                        continue
+                    ids.append(entity_id)
+                    latitudes.append(point_lat)
+                    longitudes.append(point_lon)
+
+        # Score all candidates with a single vectorized call
+        ranked = geo.sort_by_distance(latitude, longitude, latitudes, longitudes, radius_km)
+        return [(distance, ids[i]) for i, distance in ranked]
+
+    def nearest(self, latitude, longitude, k, predicate=None, max_radius_km=None):
+        """Return up to k (distance_km, id) pairs closest to the given point.
+
+        The search radius starts at one cell and doubles until k matches are
+        found, so dense areas are answered from a handful of cells.
+        """
+        self._ensure_loaded()
+        radius = self.cell_size * geo.KM_PER_DEGREE_LAT
+        limit = max_radius_km if max_radius_km is not None else math.pi * geo.EARTH_RADIUS_KM
+        while True:
+            radius = min(radius, limit)
+            results = self.within_radius(latitude, longitude, radius, predicate)
+            if len(results) >= k or radius >= limit:
+                return results[:k]
+            radius *= 2
@@ -0,0 +1,64 @@
+"""
+The one place JWTs are issued. Users and admins both get flask_jwt_extended
+tokens signed with JWT_SECRET_KEY, whose subject is their id and whose
+claims carry everything routes need to authorize a request (principal,
+role, station_id), so verifying a token never touches the database.
+
+flask_jwt_extended keeps the decoded claims of the current request in
+flask.g (get_jwt()); init_tokens() hands it the signing key read once at
+startup instead of looking it up in the app config for every token.
+"""
+from datetime import timedelta
+from flask_jwt_extended import create_access_token, create_refresh_token
+
+# User tokens keep the lifetimes they had before tokens were unified; admin
+# tokens use JWT_ACCESS_TOKEN_EXPIRES and JWT_REFRESH_TOKEN_EXPIRES
+USER_ACCESS_TOKEN_EXPIRES = timedelta(days=1)
+USER_REFRESH_TOKEN_EXPIRES = timedelta(days=7)
+
+PRINCIPALS = ("user", "admin")
+
+
+def user_claims(user):
+    return {"principal": "user", "email": user.email}
+
+
+def admin_claims(admin):
+    return {
+        "principal": "admin",
+        "role": admin.role.value,
+        "email": admin.email,
+        "name": f"{admin.first_name} {admin.last_name}",
+        "station_id": admin.station_id
+    }
+
+
+def access_token_for(identity, claims):
+    expires = USER_ACCESS_TOKEN_EXPIRES if claims["principal"] == "user" else None
+    return create_access_token(identity=str(identity), additional_claims=claims, expires_delta=expires)
+
+
+def refresh_token_for(identity, claims):
+    # Refresh tokens only say whose they are; /refresh re-reads the account for fresh claims
+    expires = USER_REFRESH_TOKEN_EXPIRES if claims["principal"] == "user" else None
+    return create_refresh_token(
+        identity=str(identity), additional_claims={"principal": claims["principal"]}, expires_delta=expires
+    )
+
+
+def issue_tokens(identity, claims):
+    """(access_token, refresh_token) for a user or admin id and its claims"""
+    return access_token_for(identity, claims), refresh_token_for(identity, claims)
+
+
+def init_tokens(app, jwt):
+    """Sign and verify with the key configured at startup"""
+    secret_key = app.config["JWT_SECRET_KEY"]
+
+    @jwt.encode_key_loader
+    def encode_key(identity):
+        return secret_key
+
+    @jwt.decode_key_loader
+    def decode_key(jwt_header, jwt_payload):
+        return secret_key
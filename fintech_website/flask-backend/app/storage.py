@@ -0,0 +1,95 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+def normalize_database_url(uri):
+    """Accept the legacy postgres:// scheme some hosting providers hand out"""
+    if uri.startswith('postgres://'):
+        return 'postgresql://' + uri[len('postgres://'):]
+    return uri
+
+
+def is_postgresql(uri):
+    return make_url(uri).get_backend_name() == 'postgresql'
+
+
+def is_sqlite(uri):
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+
+def is_sqlite_memory(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for the configured database"""
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS', {}))
+
+    # In-memory SQLite uses a single static connection; nothing to tune
+    if is_sqlite_memory(uri):
+        return options
+
+    options.setdefault('pool_size', config['DB_POOL_SIZE'])
+    options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+    options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+    options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+
+    if is_sqlite(uri):
+        connect_args = dict(options.get('connect_args', {}))
+        # Pooled connections are handed between threads of the same worker
+        connect_args.setdefault('check_same_thread', False)
+        # Python-level wait for locks, in seconds, mirroring busy_timeout
+        connect_args.setdefault('timeout', config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+        options['connect_args'] = connect_args
+
+    if is_postgresql(uri):
+        options.setdefault('pool_pre_ping', True)
+        connect_args = dict(options.get('connect_args', {}))
+        # Naive DateTime columns are read and written as UTC
+        server_options = ['-c timezone=UTC']
+        if config['DB_STATEMENT_TIMEOUT_MS']:
+            server_options.append(f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT_MS'])}")
+        connect_args.setdefault('options', ' '.join(server_options))
+        options['connect_args'] = connect_args
+
+    return options
+
+
+def sqlite_pragmas(config):
+    return [
+        f"PRAGMA journal_mode={config['SQLITE_JOURNAL_MODE']}",
+        f"PRAGMA synchronous={config['SQLITE_SYNCHRONOUS']}",
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        "PRAGMA temp_store=MEMORY",
+    ]
+
+
+def init_storage(app, db):
+    """Apply per-connection tuning to the app's engine.
+
+    Call after db.init_app(app).
+    """
+    with app.app_context():
+        engine = db.engine
+
+    if is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']) and not is_sqlite_memory(app.config['SQLALCHEMY_DATABASE_URI']):
+        pragmas = sqlite_pragmas(app.config)
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    # Pooled connections must not be shared with forked worker processes
+    # (e.g. gunicorn --preload); children start with an empty pool
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
+    return engine
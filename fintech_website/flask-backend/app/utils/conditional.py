@@ -0,0 +1,68 @@
+import hashlib
+from datetime import timezone
+from flask import current_app, g, request
+from werkzeug.http import is_resource_modified
+
+
+def make_etag(*parts):
+    """ETag for the current URL (path and query string) at the given version parts"""
+    return hashlib.sha1(repr((request.full_path, parts)).encode()).hexdigest()
+
+
+# Latest of the timestamps as naive UTC (the database hands back naive values)
+def _latest(timestamps):
+    timestamps = [
+        timestamp.astimezone(timezone.utc).replace(tzinfo=None) if timestamp.tzinfo else timestamp
+        for timestamp in timestamps if timestamp is not None
+    ]
+    return max(timestamps) if timestamps else None
+
+
+def entity_validators(*entities):
+    """
+    (etag, last_modified) of a response rendered from the given rows, e.g. a
+    rental and the vehicle and stations embedded in it. None entries are skipped.
+    """
+    versions = [(type(entity).__name__, entity.id, entity.updated_at) for entity in entities if entity is not None]
+    return make_etag(*versions), _latest([updated_at for _, _, updated_at in versions])
+
+
+def page_validators(rows, updated_fields, *parts):
+    """
+    (etag, last_modified) of a list response rendered from a page of projected
+    rows: each row's id and updated_at fields (the listed table's and those of
+    joined tables it renders from), plus whatever else the response shows, such
+    as its pagination. Built from the rows already fetched, so it costs no query.
+    """
+    versions = [(row.id, *[getattr(row, field) for field in updated_fields]) for row in rows]
+    return make_etag(versions, *parts), _latest([updated_at for version in versions for updated_at in version[1:]])
+
+
+def check_not_modified(validators):
+    """
+    Record the validators for the response and return a 304 response if the
+    client's cached copy (If-None-Match / If-Modified-Since) is still current,
+    otherwise None. Call it before serializing anything.
+    """
+    etag, last_modified = validators
+    g.response_validators = validators
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        return current_app.response_class(status=304)
+    return None
+
+
+def init_conditional_requests(app):
+    """Send the ETag / Last-Modified recorded by check_not_modified with 200 and 304 responses"""
+
+    @app.after_request
+    def add_validators(response):
+        validators = g.pop("response_validators", None)
+        if validators and response.status_code in (200, 304):
+            etag, last_modified = validators
+            response.set_etag(etag, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Responses depend on the caller; caches must revalidate and not share them
+            response.headers["Cache-Control"] = "private, no-cache"
+            response.vary.add("Authorization")
+        return response
@@ -0,0 +1,68 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+KM_PER_DEGREE_LAT = 111.32
+
+
+# Great-circle distance between two coordinates in kilometers (Haversine formula)
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+# Distances in kilometers from one origin to many points in a single NumPy pass
+def haversine_many(latitude, longitude, latitudes, longitudes):
+    lat1 = math.radians(latitude)
+    lon1 = math.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat/2)**2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon/2)**2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+# Lat/lon box that fully contains the circle of radius_km around a point.
+# Returns (min_lat, max_lat, min_lon, max_lon)
+def bounding_box(latitude, longitude, radius_km):
+    lat_span = radius_km / KM_PER_DEGREE_LAT
+    min_lat = max(latitude - lat_span, -90.0)
+    max_lat = min(latitude + lat_span, 90.0)
+
+    # Longitude degrees shrink towards the poles; use the widest latitude in the box
+    widest = max(abs(min_lat), abs(max_lat))
+    if widest >= 89.9:
+        return min_lat, max_lat, -180.0, 180.0
+    lon_span = radius_km / (KM_PER_DEGREE_LAT * math.cos(math.radians(widest)))
+    min_lon, max_lon = longitude - lon_span, longitude + lon_span
+    # A box crossing the antimeridian is not one longitude range; widen it to all
+    # longitudes and let the distance check trim it
+    if lon_span >= 180.0 or min_lon < -180.0 or max_lon > 180.0:
+        return min_lat, max_lat, -180.0, 180.0
+    return min_lat, max_lat, min_lon, max_lon
+
+
+# SQL predicates restricting latitude/longitude columns to a bounding box
+def bounding_box_filter(latitude_column, longitude_column, box):
+    min_lat, max_lat, min_lon, max_lon = box
+    return [
+        latitude_column.between(min_lat, max_lat),
+        longitude_column.between(min_lon, max_lon)
+    ]
+
+
+# Score points against an origin and order them nearest first.
+# Returns (index, distance_km) pairs, dropping points outside radius_km if given
+def sort_by_distance(latitude, longitude, latitudes, longitudes, radius_km=None):
+    if len(latitudes) == 0:
+        return []
+    distances = haversine_many(latitude, longitude, latitudes, longitudes)
+    order = np.argsort(distances, kind="stable")
+    if radius_km is not None:
+        order = order[distances[order] <= radius_km]
+    return [(int(i), float(distances[i])) for i in order]
@@ -0,0 +1,133 @@
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import and_, inspect, or_, tuple_
+
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    """One page of a keyset-paginated query"""
+
+    def __init__(self, items, per_page, has_next, next_cursor, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.has_next = has_next
+        self.next_cursor = next_cursor
+        self.total = total
+
+    def to_dict(self):
+        pagination = {
+            "per_page": self.per_page,
+            "has_next": self.has_next,
+            "next_cursor": self.next_cursor
+        }
+        if self.total is not None:
+            pagination["total"] = self.total
+        return pagination
+
+
+# Cursor values are JSON; datetimes are tagged so they decode back to datetimes
+def _dump_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _load_value(value):
+    if isinstance(value, dict):
+        try:
+            return datetime.fromisoformat(value["dt"])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidCursor("Invalid cursor")
+    return value
+
+
+def encode_cursor(sort_key, value, row_id):
+    """Opaque cursor pointing just past the row (value, row_id) for sort_key"""
+    payload = json.dumps([sort_key, _dump_value(value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor, sort_key):
+    """Return (value, row_id) from a cursor; the cursor must belong to sort_key"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if key != sort_key:
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return _load_value(value), row_id
+
+
+def wants_cursor():
+    """Cursor mode is opt-in: any request carrying a cursor param, even an empty one"""
+    return "cursor" in request.args
+
+
+def keyset_paginate(query, sort_column, descending=False, cursor=None, per_page=10, count=False):
+    """
+    Paginate query by seeking on (sort_column, primary key) instead of OFFSET.
+
+    Any existing ORDER BY on the query is replaced. Rows with a NULL sort value
+    (only possible for nullable columns) come last in either direction. The
+    total row count is only computed when count is true.
+    """
+    entity = query.column_descriptions[0]["entity"]
+    id_column = getattr(entity, inspect(entity).primary_key[0].key)
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    nullable = sort_column is not id_column and sort_column.property.columns[0].nullable
+    sort_key = "%s:%s" % (sort_column.key, "desc" if descending else "asc")
+
+    total = query.order_by(None).count() if count else None
+
+    if sort_column is id_column:
+        order_by = [id_column.desc() if descending else id_column.asc()]
+    else:
+        order_by = [sort_column.desc(), id_column.desc()] if descending else [sort_column.asc(), id_column.asc()]
+        if nullable:
+            order_by.insert(0, sort_column.is_(None))
+    query = query.order_by(None).order_by(*order_by)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort_key)
+        if sort_column is id_column:
+            seek = id_column < last_id if descending else id_column > last_id
+        elif value is None:
+            seek = and_(sort_column.is_(None), id_column < last_id if descending else id_column > last_id)
+        else:
+            key = tuple_(sort_column, id_column)
+            seek = key < tuple_(value, last_id) if descending else key > tuple_(value, last_id)
+            if nullable:
+                seek = or_(seek, sort_column.is_(None))
+        query = query.filter(seek)
+
+    # One extra row tells us whether there is a next page without counting
+    rows = query.limit(per_page + 1).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+
+    next_cursor = None
+    if has_next:
+        last = items[-1]
+        next_cursor = encode_cursor(sort_key, getattr(last, sort_column.key), getattr(last, id_column.key))
+
+    return KeysetPage(items, per_page, has_next, next_cursor, total)
+
+
+def keyset_paginate_request(query, sort_column, descending=False):
+    """keyset_paginate driven by the cursor, per_page and include_total request params"""
+    return keyset_paginate(
+        query,
+        sort_column,
+        descending=descending,
+        cursor=request.args.get("cursor"),
+        per_page=request.args.get("per_page", 10, type=int),
+        count=request.args.get("include_total", "false").lower() == "true"
+    )
@@ -0,0 +1,31 @@
+from flask import request
+
+
+def requested_serializer(serializer):
+    """
+    The serializer limited to the comma-separated `fields` request param, or the
+    full serializer when the param is absent. Raises ValueError for unknown fields.
+    """
+    fields = request.args.get("fields")
+    if not fields:
+        return serializer
+    return serializer.only([field.strip() for field in fields.split(",") if field.strip()])
+
+
+def project(query, serializer, columns, extra=()):
+    """
+    Replace the query's ORM entities with only the columns serializer reads.
+
+    columns is either a model class, whose attributes share the serializer's
+    attribute names, or a dict of label -> SQL expression. extra names columns
+    the caller needs besides the rendered ones (ids, sort keys); put the primary
+    key first so pagination can still find the entity. Returns the query, which
+    now yields plain rows without identity-map bookkeeping, and the serializer
+    compiled to read those rows by position.
+    """
+    names = list(dict.fromkeys([*extra, *serializer.columns]))
+    if isinstance(columns, dict):
+        expressions = [columns[name].label(name) for name in names]
+    else:
+        expressions = [getattr(columns, name).label(name) for name in names]
+    return query.with_entities(*expressions), serializer.for_row(names)
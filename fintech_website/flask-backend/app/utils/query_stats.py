@@ -0,0 +1,24 @@
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Count every statement sent to the database during the current request
+@event.listens_for(Engine, "before_cursor_execute")
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+
+
+def get_query_count():
+    """Number of SQL statements executed so far in this request"""
+    return g.get("query_count", 0)
+
+
+def init_query_stats(app):
+    """Expose the per-request query count as an X-Query-Count response header when QUERY_COUNT_HEADER is set"""
+    @app.after_request
+    def add_query_count_header(response):
+        if app.config["QUERY_COUNT_HEADER"]:
+            response.headers["X-Query-Count"] = str(get_query_count())
+        return response
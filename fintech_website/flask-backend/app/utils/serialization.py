@@ -0,0 +1,176 @@
+import dataclasses
+import decimal
+import json
+import orjson
+from flask.json.provider import JSONProvider
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+# Types orjson doesn't handle natively (datetime, date, UUID, enums, numpy
+# arrays and dataclasses are)
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson.
+
+    Datetimes are written in ISO 8601 like datetime.isoformat(), so views can
+    hand model values to jsonify as they are. Keys keep their insertion order
+    unless sort_keys is set.
+    """
+
+    sort_keys = False
+    mimetype = "application/json"
+
+    def _options(self, indent=False):
+        options = ORJSON_OPTIONS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        # Options orjson has no equivalent for go through the standard library
+        if set(kwargs) - {"indent", "sort_keys"}:
+            kwargs.setdefault("default", _default)
+            return json.dumps(obj, **kwargs)
+        options = self._options(indent=bool(kwargs.get("indent")))
+        if kwargs.get("sort_keys"):
+            options |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=_default, option=self._options(indent=self._app.debug))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
+class Related:
+    """Serialize a related object (or a list of them with many=True) through another Serializer"""
+
+    def __init__(self, attr, serializer, many=False):
+        self.attr = attr
+        self.serializer = serializer
+        self.many = many
+
+
+class Computed:
+    """A callable field that declares the attributes it reads, so it can be projected"""
+
+    def __init__(self, fn, *attrs):
+        self.fn = fn
+        self.attrs = attrs
+
+
+class Serializer:
+    """
+    Turns a model instance into a dict from a declarative field spec.
+
+    The spec maps output keys to an attribute name, a nested spec dict (built
+    from the same object), a callable taking the object, a Computed or a
+    Related. It is compiled once into a single function returning a dict
+    literal, so serializing a row costs one call and plain attribute reads.
+    Because only attribute reads are involved, the same serializer works on
+    ORM instances and on result rows whose labels match the attribute names;
+    for_row() compiles a variant that reads such rows by position instead.
+    """
+
+    def __init__(self, spec, name="serialize", positions=None):
+        self.spec = spec
+        self.name = name
+        self._fn = _compile(spec, name, positions)
+        self._subsets = {}
+        self._row_variants = {}
+
+    def __call__(self, obj):
+        return self._fn(obj)
+
+    def many(self, objs):
+        fn = self._fn
+        return [fn(obj) for obj in objs]
+
+    @property
+    def columns(self):
+        """Attribute names the serializer reads, in spec order"""
+        return list(dict.fromkeys(_columns(self.spec)))
+
+    def only(self, fields):
+        """Serializer limited to the given top-level fields (kept in spec order)"""
+        key = tuple(field for field in self.spec if field in set(fields))
+        unknown = set(fields) - set(self.spec)
+        if unknown:
+            raise ValueError("Unknown fields: " + ", ".join(sorted(unknown)))
+        if key not in self._subsets:
+            self._subsets[key] = Serializer({field: self.spec[field] for field in key}, name=self.name)
+        return self._subsets[key]
+
+    def for_row(self, names):
+        """
+        Variant reading plain attributes from result rows by position, given the
+        row's column names in order. Indexing a row is much cheaper than looking
+        its columns up by name; Computed fields still receive the whole row.
+        """
+        names = tuple(names)
+        if names not in self._row_variants:
+            positions = {name: index for index, name in enumerate(names)}
+            self._row_variants[names] = Serializer(self.spec, name=self.name, positions=positions)
+        return self._row_variants[names]
+
+
+def _columns(source):
+    if isinstance(source, str):
+        yield source
+    elif isinstance(source, dict):
+        for value in source.values():
+            yield from _columns(value)
+    elif isinstance(source, Computed):
+        yield from source.attrs
+    else:
+        raise TypeError(f"Field {source!r} can't be projected; declare the attributes it reads with Computed")
+
+
+def _compile(spec, name, positions=None):
+    namespace = {}
+
+    def bind(value):
+        key = f"_f{len(namespace)}"
+        namespace[key] = value
+        return key
+
+    def expr(source):
+        if isinstance(source, str):
+            if not source.isidentifier():
+                raise ValueError(f"Invalid attribute name: {source!r}")
+            if positions is not None:
+                return f"obj[{positions[source]}]"
+            return f"obj.{source}"
+        if isinstance(source, dict):
+            items = ", ".join(f"{key!r}: {expr(value)}" for key, value in source.items())
+            return "{" + items + "}"
+        if isinstance(source, Related):
+            fn = bind(source.serializer._fn)
+            if source.many:
+                return f"[{fn}(item) for item in obj.{source.attr}]"
+            return f"(None if obj.{source.attr} is None else {fn}(obj.{source.attr}))"
+        if isinstance(source, Computed):
+            return f"{bind(source.fn)}(obj)"
+        if callable(source):
+            return f"{bind(source)}(obj)"
+        raise TypeError(f"Unsupported serializer field: {source!r}")
+
+    source = f"def {name}(obj):\n    return {expr(spec)}\n"
+    exec(compile(source, f"<serializer {name}>", "exec"), namespace)
+    return namespace[name]
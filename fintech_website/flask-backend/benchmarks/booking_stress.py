@@ -0,0 +1,158 @@
+"""
+Fire hundreds of parallel bookings at a few vehicles over overlapping time
+windows, half of them with a capped discount code, and check what
+reserve_vehicle() promises: no vehicle ends up with two overlapping blocking
+rentals, and no promotion is redeemed past its global or per-user cap.
+
+Runs against a fresh file SQLite database (threads need a real file, not
+:memory:), or against TEST_DATABASE_URL when it is set. Exits 1 on any
+violation.
+
+    cd flask-backend && python -m benchmarks.booking_stress [requests] [threads]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+# The testing config reads TEST_DATABASE_URL when it is imported
+database_dir = tempfile.mkdtemp(prefix="booking-stress-")
+os.environ.setdefault("TEST_DATABASE_URL", f"sqlite:///{os.path.join(database_dir, 'stress.db')}")
+
+from app import create_app
+from app.models import db
+from app.models.promotion import Promotion, PromotionUsage, hash_code
+from app.models.rental import Rental
+from app.models.station import Station
+from app.models.user import User
+from app.models.vehicle import Vehicle
+from app.services import tokens
+from app.services.availability import BLOCKING_STATUSES
+
+VEHICLES = 4
+USERS = 40
+# Bookings start within this many hours and last 1-6 hours, so most collide
+WINDOW_HOURS = 48
+PROMO_CODE = "STRESS25"
+PROMO_CAP = 25
+PROMO_CAP_PER_USER = 2
+
+
+def seed(app):
+    with app.app_context():
+        stations = [Station(id=str(uuid.uuid4()), name=f"Stress {i}", latitude=28.6 + i / 100, longitude=77.2)
+                    for i in range(2)]
+        vehicles = [Vehicle(id=str(uuid.uuid4()), model=f"Stress {i}", vin_number=f"STRESS{uuid.uuid4().hex[:12]}",
+                            vehicle_type="SCOOTER", hourly_rate=5, daily_rate=40, weekly_rate=200,
+                            security_deposit_amount=50, station_id=stations[0].id, latitude=28.6, longitude=77.2)
+                    for i in range(VEHICLES)]
+        users = [User(id=uuid.uuid4(), email=f"stress-{uuid.uuid4().hex[:8]}@example.com",
+                      phone=uuid.uuid4().hex[:12], first_name="Stress", last_name=str(i), password_hash="-")
+                 for i in range(USERS)]
+        promotion = Promotion(code=PROMO_CODE, code_hash=hash_code(PROMO_CODE), discount_type="PERCENT",
+                              discount_value=10, max_redemptions=PROMO_CAP,
+                              max_redemptions_per_user=PROMO_CAP_PER_USER)
+        db.session.add_all([*stations, *vehicles, *users, promotion])
+        db.session.commit()
+
+        bearer = [{"Authorization": f"Bearer {tokens.access_token_for(str(user.id), tokens.user_claims(user))}"}
+                  for user in users]
+        return [s.id for s in stations], [v.id for v in vehicles], bearer, promotion.id
+
+
+def make_bookings(count, station_ids, vehicle_ids, bearer, seed=11):
+    rng = random.Random(seed)
+    base = (datetime.now(timezone.utc) + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+    bookings = []
+    for _ in range(count):
+        start = base + timedelta(hours=rng.randrange(WINDOW_HOURS))
+        body = {
+            "vehicle_id": rng.choice(vehicle_ids),
+            "pickup_station_id": station_ids[0],
+            "return_station_id": station_ids[1],
+            "start_date": start.isoformat(),
+            "end_date": (start + timedelta(hours=rng.randint(1, 6))).isoformat()
+        }
+        if rng.random() < 0.5:
+            body["discount_code"] = PROMO_CODE
+        bookings.append((rng.choice(bearer), body))
+    return bookings
+
+
+def check_overlaps(vehicle_ids):
+    """Pairs of blocking rentals of one vehicle whose [start, end) periods overlap"""
+    by_vehicle = defaultdict(list)
+    for row in db.session.query(Rental.vehicle_id, Rental.start_date, Rental.end_date).filter(
+        Rental.vehicle_id.in_(vehicle_ids), Rental.status.in_(BLOCKING_STATUSES)
+    ):
+        by_vehicle[row.vehicle_id].append((row.start_date, row.end_date))
+    overlaps = 0
+    for periods in by_vehicle.values():
+        periods.sort()
+        overlaps += sum(1 for a, b in zip(periods, periods[1:]) if b[0] < a[1])
+    return overlaps
+
+
+def check_promotion(promotion_id):
+    """Problems with the promotion's counters, as messages"""
+    problems = []
+    promotion = db.session.get(Promotion, promotion_id)
+    redeemed = Rental.query.filter(Rental.discount_code == PROMO_CODE).count()
+    if promotion.redemption_count > PROMO_CAP:
+        problems.append(f"redeemed {promotion.redemption_count} times, cap is {PROMO_CAP}")
+    if promotion.redemption_count != redeemed:
+        problems.append(f"redemption_count is {promotion.redemption_count} but {redeemed} rentals carry the code")
+
+    per_user = Counter(
+        user_id for (user_id,) in db.session.query(Rental.user_id).filter(Rental.discount_code == PROMO_CODE)
+    )
+    for usage in PromotionUsage.query.filter(PromotionUsage.promotion_id == promotion_id):
+        if usage.redemption_count > PROMO_CAP_PER_USER:
+            problems.append(f"user {usage.user_id} redeemed {usage.redemption_count} times, "
+                            f"cap is {PROMO_CAP_PER_USER}")
+        if usage.redemption_count != per_user[usage.user_id]:
+            problems.append(f"user {usage.user_id} counter is {usage.redemption_count} "
+                            f"but has {per_user[usage.user_id]} rentals with the code")
+    return problems
+
+
+def main(count, threads):
+    app = create_app("testing")
+    station_ids, vehicle_ids, bearer, promotion_id = seed(app)
+    bookings = make_bookings(count, station_ids, vehicle_ids, bearer)
+
+    def book(booking):
+        headers, body = booking
+        response = app.test_client().post("/api/rentals", headers=headers, json=body)
+        return response.status_code, response.get_json().get("error")
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        outcomes = list(pool.map(book, bookings))
+    seconds = time.perf_counter() - began
+
+    print(f"{count} bookings on {VEHICLES} vehicles from {threads} threads in {seconds:.1f}s "
+          f"({app.config['SQLALCHEMY_DATABASE_URI']})")
+    for (status, error), n in sorted(Counter(outcomes).items(), key=lambda item: (item[0][0], str(item[0][1]))):
+        print(f"  {n:4d} x {status} {error or ''}")
+    unexpected = [status for status, _ in outcomes if status not in (201, 409, 503)]
+
+    with app.app_context():
+        overlaps = check_overlaps(vehicle_ids)
+        problems = check_promotion(promotion_id)
+    print(f"overlapping rentals: {overlaps}")
+    for problem in problems:
+        print(f"promotion: {problem}")
+    if unexpected:
+        print(f"unexpected responses: {Counter(unexpected)}")
+    return 1 if overlaps or problems or unexpected else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 400,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 32))
@@ -0,0 +1,122 @@
+"""
+Measure logins per second per core through POST /api/auth/login, and how a
+login storm affects the latency of other endpoints with password hashing on
+the request threads versus on the bounded worker pool.
+
+    cd flask-backend && python -m benchmarks.password_benchmark [method] [seconds]
+
+method defaults to the production cost (pbkdf2:sha256:260000).
+"""
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+# A throwaway file database: the in-memory one is a single shared connection
+os.environ.setdefault("TEST_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/password_benchmark.db")
+
+from werkzeug.security import check_password_hash
+from app import create_app
+from app.routes import auth
+from app.models import db
+from app.models.user import User
+from app.services import passwords
+from app.services.passwords import password_hasher
+
+# Concurrent clients hammering /login during the storm
+STORM_CLIENTS = 16
+USERS = 50
+PASSWORD = "correct horse battery staple"
+
+
+class InlineHasher(passwords.PasswordHasher):
+    """The previous behaviour: hash on the calling request thread"""
+
+    def _run(self, fn, *args):
+        return fn(*args)
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+def seed_users(app):
+    with app.app_context():
+        pwhash = password_hasher.hash(PASSWORD)
+        db.session.add_all([
+            User(id=uuid.uuid4(), email=f"bench{i}@example.com", phone=f"90000{i:05d}",
+                 first_name="Bench", last_name=str(i), password_hash=pwhash)
+            for i in range(USERS)
+        ])
+        db.session.commit()
+
+
+def storm(app, seconds, login_latencies, ping_latencies):
+    """Run STORM_CLIENTS login loops plus one /ping loop, recording request latencies"""
+    stop = time.perf_counter() + seconds
+
+    def login_loop(n):
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            began = time.perf_counter()
+            response = client.post("/api/auth/login", json={"email": f"bench{n % USERS}@example.com", "password": PASSWORD})
+            assert response.status_code == 200, response.get_json()
+            login_latencies.append(time.perf_counter() - began)
+
+    def ping_loop():
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            began = time.perf_counter()
+            client.get("/ping")
+            ping_latencies.append(time.perf_counter() - began)
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=login_loop, args=(n,)) for n in range(STORM_CLIENTS)]
+    threads.append(threading.Thread(target=ping_loop))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def main(method, seconds):
+    cores = os.cpu_count() or 1
+    app = create_app("testing")
+    password_hasher.configure(method=method, workers=cores, max_pending=STORM_CLIENTS)
+    seed_users(app)
+    pwhash = password_hasher.hash(PASSWORD)
+
+    # Raw verification cost on one thread
+    began = time.perf_counter()
+    count = 0
+    while time.perf_counter() - began < seconds:
+        check_password_hash(pwhash, PASSWORD)
+        count += 1
+    raw = count / (time.perf_counter() - began)
+    print(f"{password_hasher.method}, {cores} core(s)")
+    print(f"single-thread verify: {raw:.1f}/s")
+
+    results = {}
+    for name, hasher in (("inline", InlineHasher(method=method)), ("pool", password_hasher)):
+        auth.password_hasher = hasher
+        login_latencies, ping_latencies = [], []
+        began = time.perf_counter()
+        storm(app, seconds, login_latencies, ping_latencies)
+        rate = len(login_latencies) / (time.perf_counter() - began)
+        results[name] = (rate, percentiles(login_latencies), percentiles(ping_latencies))
+
+    for name, (rate, login, ping) in results.items():
+        print(f"{name:6} {STORM_CLIENTS} clients: {rate:.1f} logins/s ({rate / cores:.1f}/s per core), "
+              f"login p50/p95 {login[0]:.0f}/{login[1]:.0f} ms, /ping p50/p95 {ping[0]:.1f}/{ping[1]:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(
+        sys.argv[1] if len(sys.argv) > 1 else passwords.DEFAULT_METHOD,
+        float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    ))
@@ -0,0 +1,100 @@
+"""
+Price one million quotes with the batch pricing engine and with the
+one-at-a-time reference, and check that both agree exactly.
+
+    cd flask-backend && python -m benchmarks.pricing_benchmark [count]
+"""
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from app.services import pricing
+
+# Share of quotes carrying a 10% discount
+DISCOUNTED_SHARE = 0.3
+DISCOUNT_RATE = 0.1
+
+# calculate_rental_cost() and build_quote() as they were in routes/rental.py
+# before the pricing engine, kept verbatim as the reference
+def reference_cost(hourly_rate, daily_rate, weekly_rate, start_date, end_date):
+    duration = (end_date - start_date).total_seconds() / 3600
+    hourly_rate = hourly_rate or 0
+    daily_rate = daily_rate or 0
+    weekly_rate = weekly_rate or 0
+    if duration <= 24:
+        hours = max(1, int(duration))
+        return hourly_rate * hours
+    elif duration <= 168:
+        days = max(1, int(duration / 24))
+        return daily_rate * days
+    else:
+        weeks = int(duration / 168)
+        remaining_days = int((duration % 168) / 24)
+        return (weekly_rate * weeks) + (daily_rate * remaining_days)
+
+
+def reference_quote(rental_cost, discount=0):
+    tax_amount = (rental_cost - discount) * 0.1
+    return rental_cost, discount, tax_amount, rental_cost - discount + tax_amount
+
+
+def make_inputs(count, seed=7):
+    rng = np.random.default_rng(seed)
+    vehicles = 500
+    hourly = np.round(rng.uniform(1, 40, vehicles), 2)
+    daily = np.round(hourly * rng.uniform(6, 12, vehicles), 2)
+    weekly = np.where(rng.random(vehicles) < 0.2, 0.0, np.round(daily * rng.uniform(4, 6, vehicles), 2))
+    vehicle_index = rng.integers(0, vehicles, count)
+
+    # Window lengths from a minute to five weeks at microsecond precision, plus
+    # the exact tier boundaries
+    lengths = rng.integers(60 * 10**6, 35 * 24 * 3600 * 10**6, count)
+    boundaries = np.array([1, 24, 25, 168, 169, 336], dtype=np.int64) * 3600 * 10**6
+    lengths[:len(boundaries) * 2] = np.concatenate([boundaries, boundaries - 1])
+    starts = np.datetime64("2026-01-01T00:00:00") + rng.integers(0, 365 * 24 * 3600, count).astype("timedelta64[s]")
+    starts = starts.astype("datetime64[us]")
+    ends = starts + lengths.astype("timedelta64[us]")
+    discount_rates = np.where(rng.random(count) < DISCOUNTED_SHARE, DISCOUNT_RATE, 0.0)
+    return hourly, daily, weekly, vehicle_index, starts, ends, discount_rates
+
+
+def main(count):
+    hourly, daily, weekly, vehicle_index, starts, ends, discount_rates = make_inputs(count)
+    start_list = starts.astype(datetime).tolist()
+    end_list = ends.astype(datetime).tolist()
+    hourly_list, daily_list, weekly_list = hourly.tolist(), daily.tolist(), weekly.tolist()
+    index_list = vehicle_index.tolist()
+    rate_list = discount_rates.tolist()
+
+    began = time.perf_counter()
+    expected = []
+    for i in range(count):
+        v = index_list[i]
+        cost = reference_cost(hourly_list[v], daily_list[v], weekly_list[v], start_list[i], end_list[i])
+        expected.append(reference_quote(cost, cost * rate_list[i] if rate_list[i] else 0))
+    reference_seconds = time.perf_counter() - began
+
+    began = time.perf_counter()
+    table = pricing.RateTable(range(len(hourly)), hourly, daily, weekly)
+    batch = pricing.RateTable(
+        vehicle_index, table.hourly[vehicle_index], table.daily[vehicle_index], table.weekly[vehicle_index]
+    )
+    quotes = batch.quote(pricing.rental_hours_many(starts, ends), discount_rates)
+    batch_seconds = time.perf_counter() - began
+
+    expected = np.array(expected, dtype=np.float64)
+    for column, name in enumerate(pricing.Quotes.__slots__):
+        mismatches = np.count_nonzero(getattr(quotes, name) != expected[:, column])
+        if mismatches:
+            print(f"{name}: {mismatches} quotes differ from the reference")
+            return 1
+
+    print(f"{count} quotes, identical to the reference")
+    print(f"reference: {reference_seconds:.3f}s ({reference_seconds / count * 1e6:.2f} us/quote)")
+    print(f"batch:     {batch_seconds:.3f}s ({batch_seconds / count * 1e6:.3f} us/quote), "
+          f"{reference_seconds / batch_seconds:.0f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
@@ -0,0 +1,126 @@
+"""
+Measure write and read throughput on one SQLite file shared by several
+worker processes, each with several threads, with SQLAlchemy's default
+engine and with the engine app/storage.py builds (pool settings, lock
+timeout and the per-connection PRAGMAs from Config). Every transaction
+inserts one row and is followed by READS_PER_WRITE single-row reads, the
+mix of a booking request.
+
+    cd flask-backend && python -m benchmarks.sqlite_benchmark [writes] [processes] [threads]
+"""
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, event, insert, select
+from sqlalchemy.exc import OperationalError
+from app.config import Config
+from app.storage import engine_options, sqlite_pragmas
+
+READS_PER_WRITE = 4
+
+metadata = MetaData()
+events = Table(
+    "bench_events", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("worker", String(20), nullable=False),
+    Column("payload", String(200), nullable=False)
+)
+
+
+def tuned_config(uri):
+    config = {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+    config["SQLALCHEMY_DATABASE_URI"] = uri
+    return config
+
+
+def make_engine(uri, tuned):
+    if not tuned:
+        return create_engine(uri)
+    config = tuned_config(uri)
+    engine = create_engine(uri, **engine_options(config))
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    return engine
+
+
+def run_worker(uri, tuned, writes, threads, start, results):
+    """One worker process: `threads` threads sharing an engine, `writes` transactions between them"""
+    engine = make_engine(uri, tuned)
+    errors = []
+    name = f"worker-{os.getpid()}"
+
+    def work(count, seed):
+        rng = random.Random(seed)
+        for _ in range(count):
+            try:
+                with engine.begin() as connection:
+                    row_id = connection.execute(
+                        insert(events).values(worker=name, payload="x" * 120)
+                    ).inserted_primary_key[0]
+                with engine.connect() as connection:
+                    for _ in range(READS_PER_WRITE):
+                        connection.execute(select(events).where(events.c.id == rng.randint(1, row_id))).first()
+            except OperationalError as e:
+                errors.append(str(e.orig))
+
+    share = [writes // threads + (1 if i < writes % threads else 0) for i in range(threads)]
+    workers = [threading.Thread(target=work, args=(count, i)) for i, count in enumerate(share)]
+    start.wait()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    engine.dispose()
+    results.put(len(errors))
+
+
+def run(tuned, writes, processes, threads):
+    """Seconds to run `writes` transactions on a fresh database, and the number of lock errors"""
+    uri = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='sqlite-benchmark-'), 'bench.db')}"
+    engine = make_engine(uri, tuned)
+    metadata.create_all(engine)
+    engine.dispose()
+
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    share = [writes // processes + (1 if i < writes % processes else 0) for i in range(processes)]
+    workers = [multiprocessing.Process(target=run_worker, args=(uri, tuned, count, threads, start, results))
+               for count in share]
+    for worker in workers:
+        worker.start()
+    # Let every worker finish importing before the clock starts
+    time.sleep(0.5)
+    began = time.perf_counter()
+    start.set()
+    errors = sum(results.get() for _ in workers)
+    seconds = time.perf_counter() - began
+    for worker in workers:
+        worker.join()
+    return seconds, errors
+
+
+def main(writes, processes, threads):
+    print(f"{writes} write transactions, each followed by {READS_PER_WRITE} reads, "
+          f"from {processes} processes x {threads} threads on one SQLite file")
+    for label, tuned in (("default", False), ("tuned", True)):
+        seconds, errors = run(tuned, writes, processes, threads)
+        print(f"  {label:8s} {seconds:5.1f}s  {writes / seconds:6.0f} writes/s  "
+              f"{writes * READS_PER_WRITE / seconds:6.0f} reads/s  {errors} lock errors")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 4000,
+                  int(sys.argv[2]) if len(sys.argv) > 2 else 4,
+                  int(sys.argv[3]) if len(sys.argv) > 3 else 4))
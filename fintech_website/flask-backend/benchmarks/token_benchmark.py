@@ -0,0 +1,62 @@
+"""
+Measure JWT verifications per second: flask_jwt_extended's decode_token()
+and the full per-request check behind @jwt_required (header parsing,
+signature, claims, revocation), with the signing key read from the app
+config on every token versus handed over once by app/services/tokens.py.
+
+    cd flask-backend && python -m benchmarks.token_benchmark [count]
+"""
+import sys
+import time
+from flask_jwt_extended import decode_token, verify_jwt_in_request
+from flask_jwt_extended.default_callbacks import default_decode_key_callback
+from app import create_app
+from app.models.admin import RoleEnum
+from app.services import tokens
+
+
+class BenchAdmin:
+    id = "7d1c1f7e-3c56-4b0e-9a8f-0c1f0a6b9d11"
+    role = RoleEnum.STATION_MASTER
+    email = "station.master@example.com"
+    first_name = "Station"
+    last_name = "Master"
+    station_id = "5e0b7c3a-2d7e-4c8b-8d3f-2a9c6e1f4b20"
+
+
+def rate(fn, count):
+    began = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return count / (time.perf_counter() - began)
+
+
+def main(count):
+    app = create_app("testing")
+    jwt_manager = app.extensions["flask-jwt-extended"]
+    cached_key = jwt_manager._decode_key_callback
+
+    with app.app_context():
+        token = tokens.access_token_for(BenchAdmin.id, tokens.admin_claims(BenchAdmin))
+
+    def request_check():
+        with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+            verify_jwt_in_request()
+
+    def request_baseline():
+        with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+            pass
+
+    with app.app_context():
+        request_overhead = 1 / rate(request_baseline, count)
+        for name, key_callback in (("config key", default_decode_key_callback), ("cached key", cached_key)):
+            jwt_manager._decode_key_callback = key_callback
+            decode_rate = rate(lambda: decode_token(token), count)
+            check_rate = 1 / (1 / rate(request_check, count) - request_overhead)
+            print(f"{name}: decode_token {decode_rate:,.0f}/s, "
+                  f"@jwt_required check {check_rate:,.0f}/s (request context setup excluded)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000))
@@ -0,0 +1,63 @@
+"""booking version and composite indexes
+
+Adds vehicles.booking_version and the composite indexes behind the rental,
+vehicle and station list queries. Databases created by db.create_all() after
+some of these were introduced may already have them, so each step checks the
+live schema first.
+
+Revision ID: 5cb6e5ad0c13
+Revises: 524f4d3426e2
+Create Date: 2026-10-18 08:48:57.111703
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5cb6e5ad0c13'
+down_revision = '524f4d3426e2'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('rentals', 'ix_rentals_vehicle_status_period', ['vehicle_id', 'status', 'start_date', 'end_date']),
+    ('rentals', 'ix_rentals_user_status_start', ['user_id', 'status', 'start_date']),
+    ('rentals', 'ix_rentals_user_status_end', ['user_id', 'status', 'end_date']),
+    ('rentals', 'ix_rentals_status_booking_date', ['status', 'booking_date']),
+    ('rentals', 'ix_rentals_pickup_station_id', ['pickup_station_id']),
+    ('rentals', 'ix_rentals_return_station_id', ['return_station_id']),
+    ('vehicles', 'ix_vehicles_station_status', ['station_id', 'status']),
+    ('vehicles', 'ix_vehicles_status_type', ['status', 'vehicle_type']),
+    ('stations', 'ix_stations_station_master_id', ['station_master_id']),
+    ('stations', 'ix_stations_is_active', ['is_active']),
+]
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    vehicle_columns = {column['name'] for column in inspector.get_columns('vehicles')}
+    if 'booking_version' not in vehicle_columns:
+        with op.batch_alter_table('vehicles', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('booking_version', sa.Integer(), server_default='0', nullable=False))
+
+    if bind.dialect.name == 'sqlite':
+        # rentals.user_id used to be a String(36) holding the dashed form;
+        # the UUID type stores 32 hex characters on SQLite
+        op.execute("UPDATE rentals SET user_id = lower(replace(user_id, '-', '')) WHERE user_id LIKE '%-%'")
+
+    for table, name, columns in INDEXES:
+        existing = {index['name'] for index in inspector.get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade():
+    for table, name, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+
+    with op.batch_alter_table('vehicles', schema=None) as batch_op:
+        batch_op.drop_column('booking_version')